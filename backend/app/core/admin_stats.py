@@ -0,0 +1,123 @@
+import asyncio
+import time
+from fastapi.concurrency import run_in_threadpool
+from app.db import get_connection, get_cursor
+from app.core.config import settings
+from app.utils.logger import logger
+
+MATERIALIZED_VIEWS = ("admin_daily_volume", "admin_user_volume")
+
+# any worker may refresh, but only one at a time
+REFRESH_LOCK_ID = 7_320_032
+
+_cache: dict[tuple, tuple[float, dict]] = {}
+
+
+def in_refresh_window(hour: int, window: str) -> bool:
+    """Whether `hour` falls in a "start-end" window (end exclusive, may wrap midnight)"""
+    if not window:
+        return True
+    start, end = (int(h) for h in window.split("-"))
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def refresh_admin_stats() -> bool:
+    """Refresh admin views that are due; returns True if any was refreshed.
+
+    A view is due when it has never been populated, or when its last refresh
+    (recorded in admin_stats_refreshes, so shared by every worker) is older
+    than ADMIN_STATS_REFRESH_SECONDS and we are inside ADMIN_STATS_REFRESH_HOURS.
+    """
+    conn = get_connection()
+    conn.autocommit = True
+    cur = conn.cursor()
+    refreshed = False
+    try:
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (REFRESH_LOCK_ID,))
+        if not cur.fetchone()[0]:
+            return False
+        try:
+            cur.execute("SELECT EXTRACT(hour FROM LOCALTIMESTAMP)::int")
+            in_window = in_refresh_window(cur.fetchone()[0], settings.ADMIN_STATS_REFRESH_HOURS)
+            for view in MATERIALIZED_VIEWS:
+                cur.execute("""
+                    SELECT m.ispopulated,
+                           r.refreshed_at IS NULL OR r.refreshed_at < now() - %s * interval '1 second' AS stale
+                    FROM pg_matviews m
+                    LEFT JOIN admin_stats_refreshes r ON r.view_name = m.matviewname
+                    WHERE m.matviewname = %s
+                """, (settings.ADMIN_STATS_REFRESH_SECONDS, view))
+                populated, stale = cur.fetchone()
+                if populated and not (stale and in_window):
+                    continue
+                # CONCURRENTLY keeps the view readable, but needs a first plain refresh
+                cur.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if populated else ''}{view}")
+                cur.execute("""
+                    INSERT INTO admin_stats_refreshes (view_name, refreshed_at) VALUES (%s, now())
+                    ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at
+                """, (view,))
+                refreshed = True
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (REFRESH_LOCK_ID,))
+        if refreshed:
+            _cache.clear()
+        return refreshed
+    finally:
+        cur.close()
+        conn.close()
+
+
+async def refresh_loop():
+    """Check every ADMIN_STATS_CHECK_SECONDS; the check is cheap and only one worker refreshes"""
+    while True:
+        try:
+            started = time.perf_counter()
+            if await run_in_threadpool(refresh_admin_stats):
+                logger.info(f"📈 Admin stats refreshed in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            logger.error(f"Admin stats refresh failed: {str(e)}")
+        await asyncio.sleep(settings.ADMIN_STATS_CHECK_SECONDS)
+
+
+def get_admin_stats(days: int, top: int) -> dict:
+    """System statistics from the materialized views, served from a TTL cache"""
+    key = (days, top)
+    cached = _cache.get(key)
+    if cached and time.monotonic() - cached[0] < settings.ADMIN_STATS_CACHE_SECONDS:
+        return cached[1]
+
+    with get_cursor() as cur:
+        cur.execute("SELECT ispopulated FROM pg_matviews WHERE matviewname = 'admin_user_volume'")
+        view = cur.fetchone()
+        if not view or not view["ispopulated"]:
+            return {"users": None, "daily_volume": [], "heaviest_users": [], "status": "pending_refresh"}
+
+        cur.execute("""
+            SELECT COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE is_admin) AS admins,
+                   COUNT(*) FILTER (WHERE txn_count > 0) AS with_transactions
+            FROM admin_user_volume
+        """)
+        users = cur.fetchone()
+
+        cur.execute("""
+            SELECT day, txn_count, total_amount, active_users
+            FROM admin_daily_volume
+            WHERE day >= CURRENT_DATE - %s
+            ORDER BY day DESC
+        """, (days,))
+        daily = [{**row, "total_amount": float(row["total_amount"] or 0)} for row in cur.fetchall()]
+
+        cur.execute("""
+            SELECT user_id, username, txn_count, total_amount
+            FROM admin_user_volume
+            ORDER BY txn_count DESC
+            LIMIT %s
+        """, (top,))
+        heaviest = [{**row, "total_amount": float(row["total_amount"] or 0)} for row in cur.fetchall()]
+
+    stats = {"users": users, "daily_volume": daily, "heaviest_users": heaviest, "status": "ok"}
+    _cache[key] = (time.monotonic(), stats)
+    return stats
@@ -0,0 +1,247 @@
+import asyncio
+import math
+import time
+import weakref
+from collections import OrderedDict, deque
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.utils.logger import logger
+
+# token-bucket cost per request, by route class
+ROUTE_COSTS = {"auth": 1, "export": 5, "read": 1, "write": 1}
+
+# only this many rate-limit buckets are kept; least recently used are dropped
+MAX_BUCKETS = 100_000
+METRIC_SAMPLES = 1024
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, message: str, retry_after: int):
+        self.status_code = status_code
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+def parse_limits(spec: str) -> dict[str, tuple[int, int]]:
+    """'auth=4/16,read=24/256' -> {'auth': (4, 16), 'read': (24, 256)}"""
+    limits = {}
+    for item in spec.split(","):
+        name, _, value = item.strip().partition("=")
+        concurrency, _, queue = value.partition("/")
+        limits[name] = (int(concurrency), int(queue or 0))
+    return limits
+
+
+def classify(method: str, path: str) -> str | None:
+    """Route class used for limits; None means the request is not limited"""
+    if method == "OPTIONS" or path.startswith("/events"):
+        return None
+    if path.startswith("/auth"):
+        return "auth"
+    if path.startswith("/transactions/export/jobs") and not path.endswith("/download"):
+        return "read"
+    if path.startswith("/transactions/export"):
+        return "export"
+    if method in ("GET", "HEAD"):
+        return "read"
+    return "write"
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed = 0
+        self.queue_ms = deque(maxlen=METRIC_SAMPLES)
+        self.service_ms = deque(maxlen=METRIC_SAMPLES)
+
+    @staticmethod
+    def _percentiles(samples) -> dict:
+        if not samples:
+            return {"p50": 0.0, "p99": 0.0}
+        ordered = sorted(samples)
+
+        def pick(q: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 2)
+
+        return {"p50": pick(0.50), "p99": pick(0.99)}
+
+    def snapshot(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "shed": self.shed,
+            "queue_ms": self._percentiles(self.queue_ms),
+            "service_ms": self._percentiles(self.service_ms),
+        }
+
+
+class RouteLimiter:
+    """Concurrency limit with a bounded wait queue for one route class"""
+
+    def __init__(self, concurrency: int, queue_size: int):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.metrics = RouteMetrics()
+
+    def _retry_after(self) -> int:
+        # expected time for the queue ahead of us to drain
+        samples = self.metrics.service_ms
+        avg_ms = sum(samples) / len(samples) if samples else 1000
+        return max(1, math.ceil(avg_ms * (self.waiting + 1) / self.concurrency / 1000))
+
+    async def acquire(self, timeout: float):
+        if self.semaphore.locked() and self.waiting >= self.queue_size:
+            self.metrics.shed += 1
+            raise Rejected(503, "Server busy, try again later", self._retry_after())
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.metrics.shed += 1
+            raise Rejected(503, "Server busy, try again later", self._retry_after())
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self.semaphore.release()
+
+
+class RateLimiter:
+    """In-memory per-user token buckets"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    def consume(self, key: str, cost: int):
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [float(self.burst), now]
+            if len(self.buckets) > MAX_BUCKETS:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] < cost:
+            retry_after = max(1, math.ceil((cost - bucket[0]) / self.rate))
+            raise Rejected(429, "Too many requests", retry_after)
+        bucket[0] -= cost
+
+
+class AdmissionController:
+    def __init__(self):
+        self.enabled = settings.ADMISSION_ENABLED
+        self.queue_timeout = settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+        self.limiters = {
+            name: RouteLimiter(concurrency, queue)
+            for name, (concurrency, queue) in parse_limits(settings.ADMISSION_LIMITS).items()
+        }
+        self.rate_limiter = RateLimiter(settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST)
+
+    def snapshot(self) -> dict:
+        return {
+            name: {
+                "concurrency": limiter.concurrency,
+                "queue_size": limiter.queue_size,
+                "in_flight": limiter.in_flight,
+                "waiting": limiter.waiting,
+                **limiter.metrics.snapshot(),
+            }
+            for name, limiter in self.limiters.items()
+        }
+
+
+admission = AdmissionController()
+
+
+def _client_key(request) -> str:
+    """JWT subject when present, otherwise the client address (e.g. for /auth/login)"""
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        payload = decode_access_token(auth[7:])
+        if payload:
+            return f"user:{payload['sub']}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class AdmissionMiddleware(BaseHTTPMiddleware):
+    """Rate limit, then queue for a concurrency slot of the request's route class.
+
+    The slot is held until the response body is fully sent, so streaming
+    exports count against the export limit for their whole duration.
+    """
+
+    async def dispatch(self, request, call_next):
+        route_class = classify(request.method, request.url.path)
+        limiter = admission.limiters.get(route_class)
+        if not admission.enabled or limiter is None:
+            return await call_next(request)
+
+        try:
+            admission.rate_limiter.consume(_client_key(request), ROUTE_COSTS.get(route_class, 1))
+        except Rejected as e:
+            limiter.metrics.rate_limited += 1
+            return self._reject(route_class, e)
+
+        queued_at = time.perf_counter()
+        try:
+            await limiter.acquire(admission.queue_timeout)
+        except Rejected as e:
+            return self._reject(route_class, e)
+        started_at = time.perf_counter()
+        limiter.metrics.admitted += 1
+        limiter.metrics.queue_ms.append((started_at - queued_at) * 1000)
+
+        released = False
+
+        def finish():
+            nonlocal released
+            if released:
+                return
+            released = True
+            limiter.metrics.service_ms.append((time.perf_counter() - started_at) * 1000)
+            limiter.release()
+
+        # until the body iterator owns the slot, any exit (including
+        # cancellation, which is not an Exception) must give it back
+        handed_off = False
+        try:
+            response = await call_next(request)
+            body = response.body_iterator
+
+            async def release_when_sent():
+                try:
+                    async for chunk in body:
+                        yield chunk
+                finally:
+                    finish()
+
+            response.body_iterator = release_when_sent()
+            # a body that is never iterated (client gone first) still releases when collected
+            weakref.finalize(response.body_iterator, finish)
+            handed_off = True
+            return response
+        finally:
+            if not handed_off:
+                finish()
+
+    @staticmethod
+    def _reject(route_class: str, exc: Rejected):
+        logger.warning(f"Admission rejected {route_class} request: {exc.message}")
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"error": exc.message},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
@@ -0,0 +1,244 @@
+import gzip
+import json
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+import psycopg2.extras
+from app.db import get_connection
+from app.core.config import settings
+from app.utils.logger import logger
+
+# Cold storage layout:
+#   archive_months        one row per (owner, month): gzip JSONL of the original rows
+#   archive_month_totals  per (owner, month, category) sums, merged into summaries
+#   archive_fingerprints  fingerprints of archived rows, checked by the duplicate probes
+#   archive_restores      restored months, kept hot until restored_until
+ARCHIVED_COLUMNS = ("id", "date", "amount", "category_id", "description", "fingerprint")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # amounts stay exact: Decimal -> "12.50"
+    return str(value)
+
+
+def _pack(rows: list[dict]) -> bytes:
+    lines = "\n".join(json.dumps({k: row[k] for k in ARCHIVED_COLUMNS}, default=_json_default) for row in rows)
+    return gzip.compress(lines.encode(), compresslevel=9)
+
+
+def _unpack(blob) -> list[dict]:
+    rows = []
+    for line in gzip.decompress(bytes(blob)).decode().splitlines():
+        row = json.loads(line)
+        row["date"] = datetime.fromisoformat(row["date"])
+        row["amount"] = Decimal(row["amount"])
+        rows.append(row)
+    return rows
+
+
+def archive_month(cur, owner_id: int, month) -> int:
+    """Move one owner's month from the hot table into the archive, in the caller's transaction"""
+    cur.execute("""
+        DELETE FROM transactions
+        WHERE owner_id = %s AND date >= %s AND date < %s::date + interval '1 month'
+        RETURNING id, date, amount, category_id, description, fingerprint
+    """, (owner_id, month, month))
+    moved = cur.fetchall()
+    if not moved:
+        return 0
+    cur.execute("DELETE FROM archive_restores WHERE owner_id = %s AND month = %s", (owner_id, month))
+
+    # late, back-dated rows land in a month that is already archived: merge them
+    cur.execute("SELECT rows FROM archive_months WHERE owner_id = %s AND month = %s FOR UPDATE", (owner_id, month))
+    existing = cur.fetchone()
+    rows = (_unpack(existing["rows"]) if existing else []) + [dict(r) for r in moved]
+    rows.sort(key=lambda r: r["date"], reverse=True)
+
+    cur.execute("""
+        INSERT INTO archive_months (owner_id, month, row_count, rows, fingerprints_indexed)
+        VALUES (%s, %s, %s, %s, TRUE)
+        ON CONFLICT (owner_id, month)
+        DO UPDATE SET row_count = EXCLUDED.row_count, rows = EXCLUDED.rows, archived_at = CURRENT_TIMESTAMP,
+                      fingerprints_indexed = TRUE
+    """, (owner_id, month, len(rows), psycopg2.Binary(_pack(rows))))
+    _index_fingerprints(cur, owner_id, month, rows)
+
+    totals = defaultdict(lambda: [Decimal(0), 0])
+    for row in rows:
+        totals[row["category_id"]][0] += row["amount"]
+        totals[row["category_id"]][1] += 1
+    cur.execute("DELETE FROM archive_month_totals WHERE owner_id = %s AND month = %s", (owner_id, month))
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO archive_month_totals (owner_id, month, category_id, total, txn_count) VALUES %s",
+        [(owner_id, month, category_id, total, count) for category_id, (total, count) in totals.items()],
+    )
+    return len(moved)
+
+
+def _index_fingerprints(cur, owner_id: int, month, rows: list[dict]):
+    cur.execute("DELETE FROM archive_fingerprints WHERE owner_id = %s AND month = %s", (owner_id, month))
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO archive_fingerprints (owner_id, fingerprint, transaction_id, month) VALUES %s "
+        "ON CONFLICT (owner_id, fingerprint) DO NOTHING",
+        [(owner_id, row["fingerprint"], row["id"], month) for row in rows if row["fingerprint"]],
+        template="(%s, %s::uuid, %s, %s)",
+    )
+
+
+def index_archived_fingerprints(batch: int = 100) -> int:
+    """Fill archive_fingerprints for months archived before it existed; returns months indexed"""
+    conn = get_connection()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    indexed = 0
+    try:
+        while True:
+            cur.execute("""
+                SELECT owner_id, month, rows FROM archive_months
+                WHERE NOT fingerprints_indexed
+                LIMIT %s FOR UPDATE SKIP LOCKED
+            """, (batch,))
+            months = cur.fetchall()
+            if not months:
+                conn.commit()
+                break
+            for m in months:
+                _index_fingerprints(cur, m["owner_id"], m["month"], _unpack(m["rows"]))
+                cur.execute(
+                    "UPDATE archive_months SET fingerprints_indexed = TRUE WHERE owner_id = %s AND month = %s",
+                    (m["owner_id"], m["month"]),
+                )
+            conn.commit()
+            indexed += len(months)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    return indexed
+
+
+def archive_older_than(days: int, batch: int = 100) -> int:
+    """Archive every whole month older than `days`, one (owner, month) per transaction.
+
+    Walks owners in id order and reads each one's old months as a range of
+    idx_transactions_owner_date, so no pass scans the whole table. Months
+    restored on demand are skipped until their archive_restores entry expires.
+    """
+    conn = get_connection()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    archived = 0
+    try:
+        cur.execute("SELECT date_trunc('month', LOCALTIMESTAMP - %s * interval '1 day') AS cutoff", (days,))
+        cutoff = cur.fetchone()["cutoff"]
+        after_id = 0
+        while True:
+            cur.execute("SELECT id FROM users WHERE id > %s ORDER BY id LIMIT %s", (after_id, batch))
+            owners = [u["id"] for u in cur.fetchall()]
+            conn.commit()
+            if not owners:
+                break
+            for owner_id in owners:
+                cur.execute("""
+                    SELECT m.month
+                    FROM (
+                        SELECT DISTINCT date_trunc('month', date)::date AS month
+                        FROM transactions
+                        WHERE owner_id = %s AND date < %s
+                    ) m
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM archive_restores r
+                        WHERE r.owner_id = %s AND r.month = m.month AND r.restored_until > CURRENT_DATE
+                    )
+                    ORDER BY m.month
+                """, (owner_id, cutoff, owner_id))
+                months = [m["month"] for m in cur.fetchall()]
+                conn.commit()
+                for month in months:
+                    archived += archive_month(cur, owner_id, month)
+                    conn.commit()
+            after_id = owners[-1]
+            logger.info(f"🗄️ Archived {archived} transactions so far (owners up to id {after_id})")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    return archived
+
+
+def restore_months(cur, owner_id: int, start_month, end_month) -> int:
+    """Move archived months in [start_month, end_month] back into the hot table"""
+    cur.execute("""
+        DELETE FROM archive_months
+        WHERE owner_id = %s AND month >= date_trunc('month', %s::date) AND month <= %s::date
+        RETURNING month, rows
+    """, (owner_id, start_month, end_month))
+    months = cur.fetchall()
+    if not months:
+        return 0
+    restored = [m["month"] for m in months]
+    cur.execute("DELETE FROM archive_month_totals WHERE owner_id = %s AND month = ANY(%s)", (owner_id, restored))
+    cur.execute("DELETE FROM archive_fingerprints WHERE owner_id = %s AND month = ANY(%s)", (owner_id, restored))
+    # keep them hot: otherwise the next archive run would move them straight back
+    cur.execute("""
+        INSERT INTO archive_restores (owner_id, month, restored_until)
+        SELECT %s, month, CURRENT_DATE + %s FROM unnest(%s::date[]) AS month
+        ON CONFLICT (owner_id, month) DO UPDATE SET restored_until = EXCLUDED.restored_until
+    """, (owner_id, settings.ARCHIVE_RESTORE_DAYS, restored))
+
+    rows = [row for m in months for row in _unpack(m["rows"])]
+    # a fingerprint re-used by a newer hot row is dropped rather than losing the restored row
+    psycopg2.extras.execute_values(
+        cur,
+        """
+        INSERT INTO transactions (id, date, amount, category_id, description, owner_id, fingerprint)
+        SELECT v.id, v.date, v.amount, c.id, v.description, v.owner_id,
+               CASE WHEN EXISTS (SELECT 1 FROM transactions o WHERE o.fingerprint = v.fingerprint)
+                    THEN NULL ELSE v.fingerprint END
+        FROM (VALUES %s) AS v (id, date, amount, category_id, description, owner_id, fingerprint)
+        LEFT JOIN categories c ON c.id = v.category_id
+        """,
+        [(r["id"], r["date"], r["amount"], r["category_id"], r["description"], owner_id, r["fingerprint"])
+         for r in rows],
+        template="(%s::int, %s::timestamp, %s::numeric, %s::int, %s::text, %s::int, %s::uuid)",
+    )
+    return len(rows)
+
+
+def iter_archived_rows(cur, owner_id: int, start: str | None = None, end: str | None = None,
+                       category_id: int | None = None):
+    """Archived rows in export shape (newest first), filtered like build_export_query"""
+    cur.execute("SELECT id, name FROM categories WHERE user_id = %s", (owner_id,))
+    names = {c["id"]: c["name"] for c in cur.fetchall()}
+    start_dt = datetime.fromisoformat(start) if start else None
+    end_dt = datetime.fromisoformat(end) if end else None
+
+    query = "SELECT month, rows FROM archive_months WHERE owner_id = %s"
+    params = [owner_id]
+    if start:
+        query += " AND month >= date_trunc('month', %s::timestamp)"
+        params.append(start)
+    if end:
+        query += " AND month <= %s::timestamp"
+        params.append(end)
+    cur.execute(query + " ORDER BY month DESC", tuple(params))
+
+    while (archived := cur.fetchone()) is not None:
+        for row in _unpack(archived["rows"]):
+            if start_dt and row["date"] < start_dt or end_dt and row["date"] > end_dt:
+                continue
+            if category_id and row["category_id"] != category_id:
+                continue
+            yield {
+                "id": row["id"],
+                "date": row["date"],
+                "amount": row["amount"],
+                "category_name": names.get(row["category_id"]),
+                "description": row["description"],
+            }
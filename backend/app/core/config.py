@@ -14,5 +14,29 @@ class Settings:
         "CORS_ORIGINS",
         "http://localhost:4200,http://127.0.0.1:4200"
     ).split(",")
+    SSE_HEARTBEAT_SECONDS: int = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+    SSE_HISTORY_SIZE: int = int(os.getenv("SSE_HISTORY_SIZE", "50"))
+    SSE_HISTORY_BYTES: int = int(os.getenv("SSE_HISTORY_BYTES", str(64 * 1024)))
+    SSE_HISTORY_TOTAL_BYTES: int = int(os.getenv("SSE_HISTORY_TOTAL_BYTES", str(16 * 1024 * 1024)))
+    SSE_RESUME_WINDOW_SECONDS: int = int(os.getenv("SSE_RESUME_WINDOW_SECONDS", "120"))
+    # Admission control: "<class>=<concurrency>/<queue size>" for auth, export, read, write.
+    # Totals stay below the 40-thread sync threadpool so cheap reads always get a thread.
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_LIMITS: str = os.getenv("ADMISSION_LIMITS", "auth=4/16,export=2/4,read=24/256,write=8/64")
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+    RATE_LIMIT_PER_SECOND: float = float(os.getenv("RATE_LIMIT_PER_SECOND", "10"))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "40"))
+    EXPORT_SPOOL_DIR: str = os.getenv("EXPORT_SPOOL_DIR", "spool/exports")
+    EXPORT_WORKERS: int = int(os.getenv("EXPORT_WORKERS", "2"))
+    EXPORT_TTL_SECONDS: int = int(os.getenv("EXPORT_TTL_SECONDS", "3600"))
+    EXPORT_STALE_SECONDS: int = int(os.getenv("EXPORT_STALE_SECONDS", "900"))
+    ARCHIVE_AFTER_DAYS: int = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+    # restored months stay in the hot table this long before archiving may take them again
+    ARCHIVE_RESTORE_DAYS: int = int(os.getenv("ARCHIVE_RESTORE_DAYS", "90"))
+    ADMIN_STATS_REFRESH_SECONDS: int = int(os.getenv("ADMIN_STATS_REFRESH_SECONDS", "900"))
+    ADMIN_STATS_CHECK_SECONDS: int = int(os.getenv("ADMIN_STATS_CHECK_SECONDS", "300"))
+    # server-local hours "start-end" (end exclusive) when refreshes may run; empty = any time
+    ADMIN_STATS_REFRESH_HOURS: str = os.getenv("ADMIN_STATS_REFRESH_HOURS", "0-6")
+    ADMIN_STATS_CACHE_SECONDS: int = int(os.getenv("ADMIN_STATS_CACHE_SECONDS", "60"))
 
 settings = Settings()
@@ -0,0 +1,35 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+# Postgres channel shared by every write path and every worker's listener
+CHANNEL = "finance_changes"
+
+# NOTIFY payloads must stay below 8000 bytes
+MAX_PAYLOAD_BYTES = 7900
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def notify_change(cur, user_id: int, entity: str, op: str, row: dict, summary: dict | None = None):
+    """Bump the user's data version and queue a change notification on the current transaction.
+
+    Postgres only delivers NOTIFY on commit, so listeners never see
+    changes that were rolled back. The data version keys cached exports.
+    """
+    cur.execute("UPDATE users SET data_version = data_version + 1 WHERE id = %s RETURNING data_version", (user_id,))
+    version = cur.fetchone()["data_version"]
+    change = {"user_id": user_id, "entity": entity, "op": op, "row": row, "summary": summary, "version": version}
+    payload = json.dumps(change, default=_json_default)
+    if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+        # oversized rows (long descriptions) are sent as a reference only
+        change["row"] = {"id": row["id"]}
+        change["partial"] = True
+        payload = json.dumps(change, default=_json_default)
+    cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
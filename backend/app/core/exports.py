@@ -0,0 +1,305 @@
+import csv
+import fcntl
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+import psycopg2.extras
+from app.db import get_connection
+from app.core import archive
+from app.core.config import settings
+from app.utils.logger import logger
+
+# Job state lives on disk so every worker sharing the spool directory sees it:
+#   <spool>/<user_id>/<job_id>.<fmt>.gz       finished result
+#   <spool>/<user_id>/<job_id>.lock           run lock: flock()ed by the export while it runs
+#   <spool>/<user_id>/<job_id>.part.<run>     output of one run, renamed into place by its owner
+#   <spool>/<user_id>/<job_id>.error          failure message
+# The kernel drops the flock if a worker dies, so there is no stale-lock guessing.
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+CSV_HEADER = ["ID", "Date", "Amount", "Category", "Description"]
+FETCH_SIZE = 5000
+CLEANUP_INTERVAL_SECONDS = 60
+LOCK_ATTEMPTS = 5
+LOCK_RETRY_SECONDS = 0.01
+
+_executor = ThreadPoolExecutor(max_workers=settings.EXPORT_WORKERS, thread_name_prefix="export")
+_cleanup_lock = threading.Lock()
+_last_cleanup = 0.0
+
+
+def build_export_query(user_id: int, start: str | None, end: str | None, category_id: int | None):
+    query = """
+        SELECT t.id, t.date, t.amount, c.name as category_name, t.description
+        FROM transactions t
+        LEFT JOIN categories c ON t.category_id = c.id
+        WHERE t.owner_id = %s
+    """
+    params = [user_id]
+    if start:
+        query += " AND t.date >= %s"
+        params.append(start)
+    if end:
+        query += " AND t.date <= %s"
+        params.append(end)
+    if category_id:
+        query += " AND t.category_id = %s"
+        params.append(category_id)
+    query += " ORDER BY t.date DESC"
+    return query, tuple(params)
+
+
+def job_id_for(user_id: int, data_version: int, fmt: str, filters: dict) -> str:
+    """Same user, filters, format and data version -> same job, so results are reused"""
+    key = json.dumps({"u": user_id, "v": data_version, "f": fmt, **filters}, sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def _user_dir(user_id: int) -> str:
+    path = os.path.join(settings.EXPORT_SPOOL_DIR, str(user_id))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def result_path(user_id: int, job_id: str) -> str | None:
+    base = os.path.join(_user_dir(user_id), job_id)
+    for fmt in FORMATS:
+        path = f"{base}.{fmt}.gz"
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _try_lock(base: str, attempts: int = 1) -> int | None:
+    """Take the job's run lock; returns the held fd, or None if a run owns it"""
+    path = f"{base}.lock"
+    for attempt in range(attempts):
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            # status probes hold the lock for a moment only
+            if attempt + 1 < attempts:
+                time.sleep(LOCK_RETRY_SECONDS)
+            continue
+        if _owns_lock(fd, base):
+            return fd
+        # cleanup unlinked the file between open and flock: retry on the new one
+        os.close(fd)
+    return None
+
+
+def _owns_lock(fd: int, base: str) -> bool:
+    try:
+        return os.fstat(fd).st_ino == os.stat(f"{base}.lock").st_ino
+    except FileNotFoundError:
+        return False
+
+
+def job_status(user_id: int, job_id: str) -> dict | None:
+    base = os.path.join(_user_dir(user_id), job_id)
+    path = result_path(user_id, job_id)
+    if path:
+        return {"job_id": job_id, "status": "done", "size": os.path.getsize(path),
+                "format": path.rsplit(".", 2)[-2]}
+    if not os.path.exists(f"{base}.lock"):
+        return None
+    fd = _try_lock(base)
+    if fd is None:
+        return {"job_id": job_id, "status": "running"}
+    os.close(fd)
+    if result_path(user_id, job_id):
+        return job_status(user_id, job_id)
+    if os.path.exists(f"{base}.error"):
+        with open(f"{base}.error") as f:
+            return {"job_id": job_id, "status": "failed", "error": f.read()}
+    return None
+
+
+def submit_export(user_id: int, job_id: str, fmt: str, filters: dict) -> dict:
+    """Start the export unless a fresh result or a live run already exists"""
+    _cleanup_expired()
+    status = job_status(user_id, job_id)
+    if status and status["status"] == "done":
+        return status
+
+    base = os.path.join(_user_dir(user_id), job_id)
+    fd = _try_lock(base, attempts=LOCK_ATTEMPTS)
+    if fd is None:
+        return {"job_id": job_id, "status": "running"}
+    try:
+        # another run may have finished between the status check and the lock
+        if result_path(user_id, job_id):
+            os.close(fd)
+            return job_status(user_id, job_id)
+        if os.path.exists(f"{base}.error"):
+            os.remove(f"{base}.error")
+        # the worker now owns the lock fd and closes it when done
+        _executor.submit(_run_export, fd, base, user_id, fmt, filters)
+    except Exception:
+        os.close(fd)
+        raise
+    return {"job_id": job_id, "status": "running"}
+
+
+def _jsonable(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _run_export(lock_fd: int, base: str, user_id: int, fmt: str, filters: dict):
+    started = time.perf_counter()
+    rows = 0
+    conn = None
+    part = f"{base}.part.{uuid.uuid4().hex}"
+    try:
+        conn = get_connection()
+        query, params = build_export_query(user_id, **filters)
+        # named (server-side) cursor: rows are streamed, never all in memory.
+        # mtime=0 keeps the gzip bytes identical for identical data, so the ETag stays honest.
+        with conn.cursor(name=f"export_{os.path.basename(base)}", cursor_factory=psycopg2.extras.RealDictCursor) as cur, \
+                open(part, "wb") as raw, \
+                gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz, \
+                io.TextIOWrapper(gz, encoding="utf-8", newline="") as out:
+            cur.itersize = FETCH_SIZE
+            cur.execute(query, params)
+            writer = csv.writer(out) if fmt == "csv" else None
+            if writer:
+                writer.writerow(CSV_HEADER)
+            archived = archive.iter_archived_rows(
+                conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor), user_id, **filters)
+            for row in itertools.chain(cur, archived):
+                if writer:
+                    writer.writerow([row["id"], row["date"], row["amount"], row["category_name"], row["description"]])
+                else:
+                    out.write(json.dumps({k: _jsonable(v) for k, v in row.items()}) + "\n")
+                rows += 1
+        conn.rollback()
+        if not _owns_lock(lock_fd, base):
+            raise RuntimeError("export lock lost")
+        os.replace(part, f"{base}.{fmt}.gz")
+        logger.info(f"📦 Export {os.path.basename(base)} finished: {rows} rows in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        logger.error(f"Export {os.path.basename(base)} failed: {str(e)}")
+        with open(f"{base}.error", "w") as f:
+            f.write("Export failed")
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+        if conn is not None:
+            conn.close()
+        os.close(lock_fd)
+
+
+def _cleanup_expired():
+    """Delete expired results and leftovers, at most once a minute.
+
+    Anything belonging to a job is only touched while holding that job's
+    lock, so a running export never loses its files.
+    """
+    global _last_cleanup
+    now = time.time()
+    if now - _last_cleanup < CLEANUP_INTERVAL_SECONDS or not _cleanup_lock.acquire(blocking=False):
+        return
+    try:
+        _last_cleanup = now
+        if not os.path.isdir(settings.EXPORT_SPOOL_DIR):
+            return
+        for user_dir in os.scandir(settings.EXPORT_SPOOL_DIR):
+            if not user_dir.is_dir():
+                continue
+            jobs = {}
+            for entry in os.scandir(user_dir.path):
+                jobs.setdefault(entry.name.split(".", 1)[0], []).append(entry)
+            for job_id, entries in jobs.items():
+                if not any(_expired(e, now) for e in entries):
+                    continue
+                base = os.path.join(user_dir.path, job_id)
+                fd = _try_lock(base)
+                if fd is None:
+                    continue  # running
+                try:
+                    # holding the lock: any .part left is from a run that died
+                    doomed = [e for e in entries if ".part." in e.name or _expired(e, now)]
+                    for entry in doomed:
+                        _remove(entry.path)
+                    if len(doomed) == len(entries) - 1:
+                        # nothing left for this job: drop the lock file while we hold it
+                        _remove(f"{base}.lock")
+                finally:
+                    os.close(fd)
+    finally:
+        _cleanup_lock.release()
+
+
+def _expired(entry, now: float) -> bool:
+    if entry.name.endswith(".lock"):
+        return False
+    limit = settings.EXPORT_STALE_SECONDS if ".part." in entry.name else settings.EXPORT_TTL_SECONDS
+    return now - _mtime(entry) > limit
+
+
+def _mtime(entry) -> float:
+    try:
+        return entry.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def parse_range(header: str | None, size: int):
+    """Parse a single 'bytes=start-end' range into (start, end) inclusive.
+
+    Returns None when the header is absent, malformed or multi-range (serve
+    the whole file); raises ValueError when it is valid but unsatisfiable (416).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, sep, end = header[6:].strip().partition("-")
+    if not sep or not (start.isdigit() or start == "") or not (end.isdigit() or end == ""):
+        return None
+    if start == "":
+        if end == "":
+            return None
+        # suffix range: last N bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+    first = int(start)
+    last = int(end) if end else size - 1
+    if end and last < first:
+        return None
+    if first >= size:
+        raise ValueError("Unsatisfiable range")
+    return first, min(last, size - 1)
+
+
+def iter_file(path: str, start: int, end: int, chunk_size: int = 64 * 1024):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,33 @@
+import hashlib
+import re
+import uuid
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+# Two rows are the same transaction when owner, calendar day, amount (to the
+# cent) and normalised description all match. The SQL function used by every
+# write path is generated from these rules; fingerprint() is the same
+# computation in Python, for scripts and tests.
+SQL_DATE_FORMAT = "YYYY-MM-DD"
+SEPARATORS = "[^a-z0-9]+"
+
+FINGERPRINT_FUNCTION = f"""
+    CREATE OR REPLACE FUNCTION transaction_fingerprint(owner INT, d TIMESTAMP, amount NUMERIC, description TEXT)
+    RETURNS UUID LANGUAGE SQL IMMUTABLE AS $$
+        SELECT md5(
+            owner::text || '|' || to_char(d, '{SQL_DATE_FORMAT}') || '|' || amount::numeric(12,2)::text || '|' ||
+            btrim(regexp_replace(lower(coalesce(description, '')), '{SEPARATORS}', ' ', 'g'))
+        )::uuid
+    $$
+"""
+
+
+def normalise_description(description: str | None) -> str:
+    """'  Coffee @ Starbucks!! ' -> 'coffee starbucks'"""
+    return re.sub(SEPARATORS, " ", (description or "").lower()).strip(" ")
+
+
+def fingerprint(owner_id: int, d: datetime, amount, description: str | None) -> uuid.UUID:
+    cents = Decimal(str(amount)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    key = f"{owner_id}|{d:%Y-%m-%d}|{cents}|{normalise_description(description)}"
+    return uuid.UUID(hashlib.md5(key.encode()).hexdigest())
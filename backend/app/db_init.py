@@ -76,6 +76,7 @@
 
 import psycopg2
 from app.core.config import settings
+from app.core.fingerprints import FINGERPRINT_FUNCTION
 from app.utils.logger import logger
 
 def init_db():
@@ -92,6 +93,8 @@ def init_db():
             is_admin BOOLEAN DEFAULT FALSE
         )
         """)
+        # bumped on every transaction/category write; keys cached exports
+        cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0")
 
         # 2. Categories table
         cur.execute("""
@@ -126,7 +129,94 @@ def init_db():
         )
         """)
 
-        # 5. Refresh tokens table
+        # Duplicate detection: content fingerprint per transaction (see ensure_fingerprint_index)
+        cur.execute(FINGERPRINT_FUNCTION)
+        # nullable without default: a catalog-only change, no table rewrite
+        cur.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS fingerprint UUID")
+
+        # 5. Archive tier: cold months as compressed row blobs + per-category totals
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS archive_months (
+            owner_id INT REFERENCES users(id) ON DELETE CASCADE,
+            month DATE NOT NULL,
+            row_count INT NOT NULL,
+            rows BYTEA NOT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (owner_id, month)
+        )
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS archive_month_totals (
+            owner_id INT REFERENCES users(id) ON DELETE CASCADE,
+            month DATE NOT NULL,
+            category_id INT,
+            total NUMERIC(14,2) NOT NULL,
+            txn_count INT NOT NULL
+        )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_archive_month_totals_owner ON archive_month_totals (owner_id, month)")
+        # fingerprints of archived rows, so duplicate checks still see them (filled by archive_month)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS archive_fingerprints (
+            owner_id INT REFERENCES users(id) ON DELETE CASCADE,
+            fingerprint UUID NOT NULL,
+            transaction_id INT NOT NULL,
+            month DATE NOT NULL,
+            PRIMARY KEY (owner_id, fingerprint)
+        )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_archive_fingerprints_month ON archive_fingerprints (owner_id, month)")
+        # months archived before archive_fingerprints existed are indexed by the archive script
+        cur.execute("ALTER TABLE archive_months ADD COLUMN IF NOT EXISTS fingerprints_indexed BOOLEAN NOT NULL DEFAULT FALSE")
+        # months brought back by POST /transactions/archive/restore: not re-archived before restored_until
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS archive_restores (
+            owner_id INT REFERENCES users(id) ON DELETE CASCADE,
+            month DATE NOT NULL,
+            restored_until DATE NOT NULL,
+            PRIMARY KEY (owner_id, month)
+        )
+        """)
+
+        # 6. Admin aggregates (created empty, filled by app.core.admin_stats.refresh_admin_stats)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_users_username_prefix ON users (lower(username) text_pattern_ops)")
+        cur.execute("""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS admin_daily_volume AS
+            SELECT date::date AS day, COUNT(*) AS txn_count, SUM(amount) AS total_amount,
+                   COUNT(DISTINCT owner_id) AS active_users
+            FROM transactions
+            WHERE date >= CURRENT_DATE - 365
+            GROUP BY 1
+        WITH NO DATA
+        """)
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS admin_daily_volume_day ON admin_daily_volume (day)")
+        cur.execute("""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS admin_user_volume AS
+            SELECT u.id AS user_id, u.username, u.is_admin,
+                   COALESCE(h.txn_count, 0) + COALESCE(a.txn_count, 0) AS txn_count,
+                   COALESCE(h.total_amount, 0) + COALESCE(a.total_amount, 0) AS total_amount
+            FROM users u
+            LEFT JOIN (
+                SELECT owner_id, COUNT(*) AS txn_count, SUM(amount) AS total_amount
+                FROM transactions GROUP BY owner_id
+            ) h ON h.owner_id = u.id
+            LEFT JOIN (
+                SELECT owner_id, SUM(txn_count) AS txn_count, SUM(total) AS total_amount
+                FROM archive_month_totals GROUP BY owner_id
+            ) a ON a.owner_id = u.id
+        WITH NO DATA
+        """)
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS admin_user_volume_user ON admin_user_volume (user_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS admin_user_volume_heaviest ON admin_user_volume (txn_count DESC)")
+        # last refresh per view, shared by all workers
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS admin_stats_refreshes (
+            view_name TEXT PRIMARY KEY,
+            refreshed_at TIMESTAMPTZ NOT NULL
+        )
+        """)
+
+        # 7. Refresh tokens table
         cur.execute("""
         CREATE TABLE IF NOT EXISTS refresh_tokens (
             id SERIAL PRIMARY KEY,
@@ -144,3 +234,48 @@ def init_db():
     except Exception as e:
         logger.error(f"❌ Error initializing database: {str(e)}")
         raise
+
+
+def ensure_fingerprint_index():
+    """Unique partial index on transactions.fingerprint, built CONCURRENTLY so writes are never blocked.
+
+    Not part of init_db: the build can take minutes on a large table, so it is
+    run by scripts/backfill_fingerprints.py. Writes do not depend on it
+    existing (they probe and use a targetless ON CONFLICT). Rows with a NULL
+    fingerprint (pre-existing until backfilled, or saved with allow_duplicate)
+    are outside the index.
+    """
+    _create_index_concurrently(
+        "transactions_fingerprint_key",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS transactions_fingerprint_key "
+        "ON transactions (fingerprint) WHERE fingerprint IS NOT NULL",
+    )
+
+
+def ensure_archive_index():
+    """(owner_id, date) index so archiving reads each owner's old months as an index range.
+
+    Built CONCURRENTLY by scripts/archive_transactions.py, like ensure_fingerprint_index.
+    """
+    _create_index_concurrently(
+        "idx_transactions_owner_date",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_owner_date ON transactions (owner_id, date)",
+    )
+
+
+def _create_index_concurrently(name: str, ddl: str):
+    conn = psycopg2.connect(settings.DATABASE_URL)
+    conn.autocommit = True  # CONCURRENTLY cannot run inside a transaction block
+    cur = conn.cursor()
+    try:
+        # a failed concurrent build leaves an INVALID index behind that IF NOT EXISTS would keep
+        cur.execute("""
+            SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s AND NOT i.indisvalid
+        """, (name,))
+        if cur.fetchone():
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        cur.execute(ddl)
+    finally:
+        cur.close()
+        conn.close()
@@ -1,12 +1,15 @@
+import asyncio
 from fastapi import FastAPI, Request
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
-from app.utils.logger import logger
+from app.utils.logger import logger, redact
 from app.core.exceptions import add_exception_handlers
+from app.core.admission import AdmissionMiddleware
+from app.core.admin_stats import refresh_loop
 from app.db_init import init_db
 from app.routes import auth, transactions, admin
 from app.core.config import settings
-from app.routes import auth, transactions, categories
+from app.routes import auth, transactions, categories, dashboard, events
 
 
 # Initialize DB tables
@@ -21,6 +24,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admission control (added before CORS so 429/503 responses still get CORS headers)
+app.add_middleware(AdmissionMiddleware)
+
 # CORS (important for frontend)
 app.add_middleware(
     CORSMiddleware,
@@ -33,7 +39,7 @@ app.add_middleware(
 # Middleware for request logging
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    logger.info(f"{request.method} {request.url}")
+    logger.info(f"{request.method} {redact(str(request.url))}")
     response = await call_next(request)
     logger.info(f"Completed with status {response.status_code}")
     return response
@@ -46,6 +52,34 @@ app.include_router(auth.router)
 app.include_router(transactions.router)
 app.include_router(admin.router)
 app.include_router(categories.router)
+app.include_router(dashboard.router)
+app.include_router(events.router)
+
+
+# Shared LISTEN connection for live updates (one per worker)
+@app.on_event("startup")
+async def start_change_listener():
+    events.broker.start()
+
+
+# Periodic refresh of the admin materialized views
+@app.on_event("startup")
+async def start_admin_stats_refresher():
+    app.state.stats_refresher = asyncio.create_task(refresh_loop())
+
+
+@app.on_event("shutdown")
+async def stop_change_listener():
+    events.broker.stop()
+
+
+@app.on_event("shutdown")
+async def stop_admin_stats_refresher():
+    app.state.stats_refresher.cancel()
+    try:
+        await app.state.stats_refresher
+    except asyncio.CancelledError:
+        pass
 
 
 @app.get("/")
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from fastapi.security import OAuth2PasswordBearer
 from app.db import get_cursor
 from app.core.security import decode_access_token
 from app.core.exceptions import AppException
+from app.core.admission import admission
+from app.core.admin_stats import get_admin_stats
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -26,12 +28,44 @@ def require_admin(username: str):
 
 
 @router.get("/users")
-def list_users(username: str = Depends(get_current_user)):
-    """List all users (Admin only)"""
+def list_users(
+    username: str = Depends(get_current_user),
+    after_id: int | None = Query(None, description="Keyset cursor: last user id of the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    search: str | None = Query(None, description="Username prefix"),
+):
+    """List users a page at a time (Admin only)"""
     require_admin(username)
+    query = "SELECT id, username, is_admin FROM users WHERE TRUE"
+    params = []
+    if search:
+        # prefix match served by idx_users_username_prefix
+        query += " AND lower(username) LIKE %s"
+        params.append(search.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    if after_id is not None:
+        query += " AND id > %s"
+        params.append(after_id)
+    query += " ORDER BY id LIMIT %s"
+    params.append(limit + 1)
+
     with get_cursor() as cur:
-        cur.execute("SELECT id, username, is_admin FROM users ORDER BY id")
-        return cur.fetchall()
+        cur.execute(query, tuple(params))
+        rows = cur.fetchall()
+
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    return {"items": items, "next_cursor": items[-1]["id"] if has_more else None}
+
+
+@router.get("/stats")
+def system_stats(
+    username: str = Depends(get_current_user),
+    days: int = Query(30, ge=1, le=365),
+    top: int = Query(10, ge=1, le=100),
+):
+    """User counts, daily transaction volume and heaviest users (Admin only)"""
+    require_admin(username)
+    return get_admin_stats(days, top)
 
 
 @router.patch("/make-admin/{user_id}")
@@ -56,3 +90,10 @@ def remove_admin(user_id: int, username: str = Depends(get_current_user)):
         if not updated:
             raise AppException("User not found", 404)
         return updated
+
+
+@router.get("/metrics/admission")
+def admission_metrics(username: str = Depends(get_current_user)):
+    """Per route class queue time vs service time, and rejection counts"""
+    require_admin(username)
+    return admission.snapshot()
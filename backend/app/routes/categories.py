@@ -4,6 +4,8 @@ from app.db import get_cursor
 from app import schemas
 from app.core.security import decode_access_token
 from app.core.exceptions import AppException
+from app.core.events import notify_change
+from app.routes.transactions import fetch_summary
 from app.utils.logger import logger
 
 router = APIRouter(prefix="/categories", tags=["categories"])
@@ -35,6 +37,7 @@ def create_category(cat: schemas.CategoryCreate, username: str = Depends(get_cur
             (cat.name.capitalize(), user["id"]),
         )
         new_cat = cur.fetchone()
+        notify_change(cur, user["id"], "category", "created", new_cat)
         logger.info(f"✅ Category created by {username}: {cat.name}")
         return new_cat
 
@@ -71,5 +74,8 @@ def delete_category(cat_id: int = Path(...), username: str = Depends(get_current
         if not deleted:
             raise AppException("Category not found or not owned by user", 404)
 
+        # transactions in this category lose it (ON DELETE SET NULL), so totals can move
+        notify_change(cur, user["id"], "category", "deleted", deleted, fetch_summary(cur, user["id"]))
+
         logger.info(f"🗑️ Category {cat_id} deleted by {username}")
         return {"message": f"Category {cat_id} deleted successfully"}
@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.security import OAuth2PasswordBearer
+from app.db import get_cursor
+from app import schemas
+from app.core.security import decode_access_token
+from app.core.exceptions import AppException
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
+
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    payload = decode_access_token(token)
+    if not payload:
+        raise AppException("Invalid or expired token", 401)
+    return payload["sub"]
+
+
+# One statement for the whole page: user lookup, first page of transactions,
+# summary and categories are all resolved in a single round trip.
+DASHBOARD_QUERY = """
+    WITH u AS (
+        SELECT id FROM users WHERE username = %s
+    ),
+    page AS (
+        SELECT t.id, t.date, t.amount, t.category_id, c.name AS category_name,
+               t.description, t.owner_id
+        FROM transactions t
+        LEFT JOIN categories c ON t.category_id = c.id
+        WHERE t.owner_id = (SELECT id FROM u)
+        ORDER BY t.date DESC
+        LIMIT %s
+    ),
+    totals AS (
+        SELECT COALESCE(SUM(t.amount) FILTER (WHERE c.name = 'Income'), 0) AS income,
+               COALESCE(SUM(t.amount) FILTER (WHERE c.name = 'Expense'), 0) AS expense
+        FROM (
+            SELECT category_id, amount FROM transactions WHERE owner_id = (SELECT id FROM u)
+            UNION ALL
+            SELECT category_id, total FROM archive_month_totals WHERE owner_id = (SELECT id FROM u)
+        ) t
+        JOIN categories c ON t.category_id = c.id
+    )
+    SELECT
+        (SELECT id FROM u) AS user_id,
+        COALESCE((SELECT json_agg(page ORDER BY page.date DESC) FROM page), '[]'::json) AS transactions,
+        (SELECT income FROM totals) AS income,
+        (SELECT expense FROM totals) AS expense,
+        COALESCE(
+            (SELECT json_agg(json_build_object('id', id, 'name', name, 'user_id', user_id))
+             FROM categories WHERE user_id = (SELECT id FROM u)),
+            '[]'::json
+        ) AS categories
+"""
+
+
+# ------------------------
+# Dashboard bootstrap
+# ------------------------
+@router.get("/", response_model=schemas.DashboardOut)
+def get_dashboard(
+    username: str = Depends(get_current_user),
+    limit: int = Query(20, ge=1, le=100),
+):
+    with get_cursor() as cur:
+        cur.execute(DASHBOARD_QUERY, (username, limit))
+        row = cur.fetchone()
+        if not row or row["user_id"] is None:
+            raise AppException("User not found", 404)
+
+        return shape_dashboard(row)
+
+
+def shape_dashboard(row: dict) -> dict:
+    income = row["income"] or 0
+    expense = row["expense"] or 0
+    return {
+        "transactions": row["transactions"],
+        "summary": {
+            "total_income": float(income),
+            "total_expense": float(expense),
+            "net_savings": float(income - expense),
+        },
+        "categories": row["categories"],
+    }
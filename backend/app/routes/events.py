@@ -0,0 +1,275 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict, deque
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+import psycopg2.extensions
+from app.db import get_connection, get_cursor
+from app.core.config import settings
+from app.core.events import CHANNEL
+from app.core.security import decode_access_token
+from app.core.exceptions import AppException
+from app.utils.logger import logger
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# EventSource cannot send headers, so the token may also come as ?token=
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+RECONNECT_DELAY_SECONDS = 1
+PRUNE_INTERVAL_SECONDS = 30
+
+
+def get_current_user(bearer: str | None = Depends(oauth2_scheme), token: str | None = Query(None)):
+    payload = decode_access_token(bearer or token or "")
+    if not payload:
+        raise AppException("Invalid or expired token", 401)
+    return payload["sub"]
+
+
+class _History:
+    """Recent events for one user, used to replay after a reconnect"""
+    __slots__ = ("events", "bytes", "dropped_upto", "detached_at")
+
+    def __init__(self, dropped_upto: int):
+        self.events = deque()
+        self.bytes = 0
+        # events with seq <= dropped_upto may be missing: older tokens must resync
+        self.dropped_upto = dropped_upto
+        self.detached_at = None
+
+
+class ChangeBroker:
+    """One LISTEN connection per worker, fanned out to per-user SSE queues.
+
+    The listener socket is registered with the event loop, so idle
+    subscribers are just an empty asyncio.Queue each: no threads, no polling
+    and no database work until a NOTIFY arrives. Replay history is only kept
+    for users with a live subscriber or one that disconnected within
+    SSE_RESUME_WINDOW_SECONDS, and is bounded in bytes per user and overall.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.subscribers: dict[int, set[asyncio.Queue]] = {}
+        self.history: OrderedDict[int, _History] = OrderedDict()
+        self.history_bytes = 0
+        self.last_prune = 0.0
+        self.conn = None
+        self.fd = None
+        self.loop = None
+
+    # ---------- listener ----------
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.conn = get_connection()
+        self.conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with self.conn.cursor() as cur:
+            cur.execute(f"LISTEN {CHANNEL}")
+        # keep the fd: once the connection breaks, conn.fileno() raises
+        self.fd = self.conn.fileno()
+        self.loop.add_reader(self.fd, self._drain)
+        logger.info(f"📡 Listening for changes on '{CHANNEL}'")
+
+    def stop(self):
+        if self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            self.fd = None
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _drain(self):
+        try:
+            self.conn.poll()
+        except psycopg2.Error as e:
+            logger.error(f"Change listener lost its connection: {str(e)}")
+            self._restart()
+            return
+        while self.conn.notifies:
+            note = self.conn.notifies.pop(0)
+            self.publish(json.loads(note.payload))
+
+    def _restart(self):
+        self.stop()
+        # anything sent while we were disconnected is gone: invalidate all tokens
+        self.epoch = uuid.uuid4().hex[:8]
+        self.history.clear()
+        self.history_bytes = 0
+        for user_id in list(self.subscribers):
+            self._broadcast(user_id, self._resync_event())
+        self.loop.call_later(RECONNECT_DELAY_SECONDS, self._reconnect)
+
+    def _reconnect(self):
+        try:
+            self.start()
+        except Exception:
+            self.loop.call_later(RECONNECT_DELAY_SECONDS, self._reconnect)
+
+    # ---------- fan out ----------
+    def publish(self, change: dict):
+        user_id = change.pop("user_id")
+        self.seq += 1
+        event = {"seq": self.seq, "id": f"{self.epoch}-{self.seq}", "event": "change", "data": change}
+        event["frame"] = _format(event)
+        self._remember(user_id, event)
+        self._broadcast(user_id, event)
+
+    def _broadcast(self, user_id: int, event: dict):
+        for queue in self.subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # slow consumer: drop its backlog and make it reload instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._resync_event())
+
+    def _remember(self, user_id: int, event: dict):
+        now = time.monotonic()
+        if now - self.last_prune > PRUNE_INTERVAL_SECONDS:
+            self._prune(now)
+
+        entry = self.history.get(user_id)
+        if entry is None:
+            if user_id not in self.subscribers:
+                return  # nobody can resume: keep nothing
+            # history was evicted while subscribed: earlier events are unknown
+            entry = self.history[user_id] = _History(event["seq"] - 1)
+        elif entry.detached_at is not None and now - entry.detached_at > settings.SSE_RESUME_WINDOW_SECONDS:
+            self._drop(user_id)
+            return
+
+        self.history.move_to_end(user_id)
+        size = len(event["frame"])
+        entry.events.append(event)
+        entry.bytes += size
+        self.history_bytes += size
+        while entry.events and (len(entry.events) > settings.SSE_HISTORY_SIZE
+                                or entry.bytes > settings.SSE_HISTORY_BYTES):
+            old = entry.events.popleft()
+            entry.bytes -= len(old["frame"])
+            self.history_bytes -= len(old["frame"])
+            entry.dropped_upto = old["seq"]
+        # over the worker-wide budget: drop least recently written users
+        while self.history_bytes > settings.SSE_HISTORY_TOTAL_BYTES and self.history:
+            self._drop(next(iter(self.history)))
+
+    def _drop(self, user_id: int):
+        entry = self.history.pop(user_id, None)
+        if entry is not None:
+            self.history_bytes -= entry.bytes
+
+    def _prune(self, now: float):
+        self.last_prune = now
+        expired = [
+            user_id for user_id, entry in self.history.items()
+            if entry.detached_at is not None and now - entry.detached_at > settings.SSE_RESUME_WINDOW_SECONDS
+        ]
+        for user_id in expired:
+            self._drop(user_id)
+
+    def _resync_event(self) -> dict:
+        return {"seq": self.seq, "id": f"{self.epoch}-{self.seq}", "event": "resync", "data": {}}
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.setdefault(user_id, set()).add(queue)
+        entry = self.history.get(user_id)
+        if entry is None:
+            self.history[user_id] = _History(self.seq)
+        else:
+            entry.detached_at = None
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self.subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[user_id]
+                entry = self.history.get(user_id)
+                if entry is not None:
+                    # kept for SSE_RESUME_WINDOW_SECONDS so a reconnect can resume
+                    entry.detached_at = time.monotonic()
+
+    def replay(self, user_id: int, resume_token: str | None) -> list[dict]:
+        """Events missed since resume_token, or a single resync event if they are no longer known"""
+        if not resume_token:
+            return []
+        epoch, _, seq = resume_token.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return [self._resync_event()]
+        seq = int(seq)
+        entry = self.history.get(user_id)
+        if entry is None:
+            return [self._resync_event()] if seq < self.seq else []
+        if seq < entry.dropped_upto:
+            return [self._resync_event()]
+        return [event for event in entry.events if event["seq"] > seq]
+
+
+broker = ChangeBroker()
+
+
+def _format(event: dict) -> str:
+    if "frame" in event:
+        return event["frame"]
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+def _lookup_user_id(username: str):
+    with get_cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+        user = cur.fetchone()
+        return user["id"] if user else None
+
+
+# ------------------------
+# Live change stream (SSE)
+# ------------------------
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    username: str = Depends(get_current_user),
+    resume: str | None = Query(None, description="Resume token (last event id received)"),
+    last_event_id: str | None = Header(None),
+):
+    user_id = await run_in_threadpool(_lookup_user_id, username)
+    if user_id is None:
+        raise AppException("User not found", 404)
+    resume_token = last_event_id or resume
+
+    async def event_stream():
+        # subscribe before replaying so nothing falls in between
+        queue = broker.subscribe(user_id)
+        try:
+            last_seq = 0
+            for event in broker.replay(user_id, resume_token):
+                last_seq = event["seq"]
+                yield _format(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), settings.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if event["event"] == "change" and event["seq"] <= last_seq:
+                    continue
+                yield _format(event)
+        finally:
+            broker.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,12 +1,19 @@
 import csv
 import io
-from fastapi import APIRouter, Depends, Path, Query
-from fastapi.responses import StreamingResponse
+import os
+from datetime import date
+from typing import Literal
+import psycopg2.errors
+import psycopg2.extras
+from fastapi import APIRouter, Depends, Path, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from app.db import get_cursor
 from app import schemas
 from app.core.security import decode_access_token
 from app.core.exceptions import AppException
+from app.core.events import notify_change
+from app.core import archive, exports
 from app.utils.logger import logger
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
@@ -21,11 +28,36 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     return payload["sub"]
 
 
+def fetch_summary(cur, user_id: int) -> dict:
+    """Income/expense totals for a user in a single aggregate query (hot rows + archived months)"""
+    cur.execute("""
+        SELECT COALESCE(SUM(t.amount) FILTER (WHERE c.name='Income'), 0) as income,
+               COALESCE(SUM(t.amount) FILTER (WHERE c.name='Expense'), 0) as expense
+        FROM (
+            SELECT category_id, amount FROM transactions WHERE owner_id=%s
+            UNION ALL
+            SELECT category_id, total FROM archive_month_totals WHERE owner_id=%s
+        ) t
+        JOIN categories c ON t.category_id = c.id
+    """, (user_id, user_id))
+    row = cur.fetchone()
+    income, expense = row["income"] or 0, row["expense"] or 0
+    return {
+        "total_income": float(income),
+        "total_expense": float(expense),
+        "net_savings": float(income - expense)
+    }
+
+
 # ------------------------
 # Add a new transaction
 # ------------------------
 @router.post("/", response_model=schemas.TransactionOut)
-def create_transaction(txn: schemas.TransactionCreate, username: str = Depends(get_current_user)):
+def create_transaction(
+    txn: schemas.TransactionCreate,
+    allow_duplicate: bool = Query(False, description="Save even if it matches an existing transaction"),
+    username: str = Depends(get_current_user),
+):
     with get_cursor() as cur:
         # find user id
         cur.execute("SELECT id FROM users WHERE username = %s", (username,))
@@ -39,26 +71,152 @@ def create_transaction(txn: schemas.TransactionCreate, username: str = Depends(g
         if not category:
             raise AppException("Invalid category for this user", 400)
 
+        params = {"amount": txn.amount, "category_id": txn.category_id, "description": txn.description,
+                  "owner_id": user["id"], "allow_duplicate": allow_duplicate}
+        # archived rows count too: their fingerprints live in archive_fingerprints
+        duplicate_query = """
+            WITH f AS (
+                SELECT transaction_fingerprint(%(owner_id)s, LOCALTIMESTAMP, %(amount)s, %(description)s) AS fp
+            )
+            SELECT t.id FROM transactions t, f WHERE t.owner_id = %(owner_id)s AND t.fingerprint = f.fp
+            UNION ALL
+            SELECT a.transaction_id FROM archive_fingerprints a, f WHERE a.owner_id = %(owner_id)s AND a.fingerprint = f.fp
+            LIMIT 1
+        """
+        if not allow_duplicate:
+            cur.execute(duplicate_query, params)
+            duplicate = cur.fetchone()
+            if duplicate:
+                raise AppException(f"Duplicate of transaction {duplicate['id']}", 409)
+
+        # no conflict target: works whether or not the fingerprint index has been built yet,
+        # and once it is valid it also catches a concurrent identical insert
         cur.execute(
             """
-            INSERT INTO transactions (amount, category_id, description, owner_id)
-            VALUES (%s, %s, %s, %s)
+            INSERT INTO transactions (date, amount, category_id, description, owner_id, fingerprint)
+            VALUES (LOCALTIMESTAMP, %(amount)s, %(category_id)s, %(description)s, %(owner_id)s,
+                    CASE WHEN %(allow_duplicate)s THEN NULL
+                         ELSE transaction_fingerprint(%(owner_id)s, LOCALTIMESTAMP, %(amount)s, %(description)s) END)
+            ON CONFLICT DO NOTHING
             RETURNING id, date, amount, category_id, description, owner_id
             """,
-            (txn.amount, txn.category_id, txn.description, user["id"]),
+            params,
         )
         new_txn = cur.fetchone()
+        if not new_txn:
+            cur.execute(duplicate_query, params)
+            duplicate = cur.fetchone()
+            raise AppException(f"Duplicate of transaction {duplicate['id'] if duplicate else ''}".strip(), 409)
+
         new_txn["category_name"] = category["name"]
+        notify_change(cur, user["id"], "transaction", "created", new_txn, fetch_summary(cur, user["id"]))
 
         logger.info(f"✅ Transaction added by {username}: {txn.amount} in {category['name']}")
         return new_txn
 
 
+# ------------------------
+# Bulk import (deduplicated)
+# ------------------------
+@router.post("/import", response_model=schemas.ImportResult)
+def import_transactions(rows: list[schemas.TransactionImport], username: str = Depends(get_current_user)):
+    with get_cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+        user = cur.fetchone()
+        if not user:
+            raise AppException("User not found", 404)
+        if not rows:
+            return {"received": 0, "inserted": 0, "duplicates": 0}
+
+        category_ids = list({row.category_id for row in rows})
+        cur.execute("SELECT id FROM categories WHERE user_id = %s AND id = ANY(%s)", (user["id"], category_ids))
+        if len(cur.fetchall()) != len(category_ids):
+            raise AppException("Invalid category for this user", 400)
+
+        # rows colliding with stored (hot or archived) transactions, or with each other, are skipped;
+        # ON CONFLICT (no target) also covers a concurrent import once the fingerprint index is valid
+        inserted = psycopg2.extras.execute_values(
+            cur,
+            """
+            INSERT INTO transactions (date, amount, category_id, description, owner_id, fingerprint)
+            SELECT DISTINCT ON (f.fp) f.date, f.amount, f.category_id, f.description, f.owner_id, f.fp
+            FROM (
+                -- undated rows use the database clock, like create_transaction
+                SELECT v.date, v.amount, v.category_id, v.description, v.owner_id,
+                       transaction_fingerprint(v.owner_id, v.date, v.amount, v.description) AS fp
+                FROM (
+                    SELECT COALESCE(r.date, LOCALTIMESTAMP) AS date, r.amount, r.category_id, r.description, r.owner_id
+                    FROM (VALUES %s) AS r (date, amount, category_id, description, owner_id)
+                ) v
+            ) f
+            WHERE NOT EXISTS (
+                SELECT 1 FROM transactions o WHERE o.owner_id = f.owner_id AND o.fingerprint = f.fp
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM archive_fingerprints a WHERE a.owner_id = f.owner_id AND a.fingerprint = f.fp
+            )
+            ON CONFLICT DO NOTHING
+            RETURNING id
+            """,
+            [(row.date, row.amount, row.category_id, row.description, user["id"]) for row in rows],
+            template="(%s::timestamp, %s::numeric, %s::int, %s::text, %s::int)",
+            fetch=True,
+        )
+
+        if inserted:
+            notify_change(cur, user["id"], "transaction", "imported", {"id": None, "inserted": len(inserted)},
+                          fetch_summary(cur, user["id"]))
+        logger.info(f"📥 {len(inserted)}/{len(rows)} transactions imported by {username}")
+        return {"received": len(rows), "inserted": len(inserted), "duplicates": len(rows) - len(inserted)}
+
+
+# ------------------------
+# Suspected duplicates report
+# ------------------------
+@router.get("/duplicates", response_model=list[schemas.DuplicateGroup])
+def list_duplicates(username: str = Depends(get_current_user), limit: int = Query(50, ge=1, le=500)):
+    """Groups of transactions sharing a fingerprint, including ones saved with allow_duplicate"""
+    with get_cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+        user = cur.fetchone()
+        if not user:
+            raise AppException("User not found", 404)
+
+        cur.execute("""
+            SELECT COALESCE(t.fingerprint, transaction_fingerprint(t.owner_id, t.date, t.amount, t.description)) AS fingerprint,
+                   COUNT(*) AS count,
+                   json_agg(json_build_object('id', t.id, 'date', t.date, 'amount', t.amount,
+                                              'category_id', t.category_id, 'description', t.description,
+                                              'owner_id', t.owner_id) ORDER BY t.id) AS transactions
+            FROM transactions t
+            WHERE t.owner_id = %s
+            GROUP BY 1
+            HAVING COUNT(*) > 1
+            ORDER BY COUNT(*) DESC
+            LIMIT %s
+        """, (user["id"], limit))
+        return cur.fetchall()
+
+
 # ------------------------
 # Summary API
 # ------------------------
 @router.get("/summary")
 def get_summary(username: str = Depends(get_current_user)):
+    with get_cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+        user = cur.fetchone()
+        if not user:
+            raise AppException("User not found", 404)
+
+        return fetch_summary(cur, user["id"])
+
+
+# ------------------------
+# Monthly totals (hot rows + archived months)
+# ------------------------
+@router.get("/monthly")
+def get_monthly(username: str = Depends(get_current_user), months: int = Query(12, ge=1, le=240)):
     with get_cursor() as cur:
         cur.execute("SELECT id FROM users WHERE username = %s", (username,))
         user = cur.fetchone()
@@ -66,26 +224,67 @@ def get_summary(username: str = Depends(get_current_user)):
             raise AppException("User not found", 404)
 
         cur.execute("""
-            SELECT COALESCE(SUM(amount),0) as income
-            FROM transactions t
+            SELECT t.month,
+                   COALESCE(SUM(t.amount) FILTER (WHERE c.name='Income'), 0) as income,
+                   COALESCE(SUM(t.amount) FILTER (WHERE c.name='Expense'), 0) as expense
+            FROM (
+                SELECT date_trunc('month', date)::date AS month, category_id, amount
+                FROM transactions WHERE owner_id=%s
+                UNION ALL
+                SELECT month, category_id, total FROM archive_month_totals WHERE owner_id=%s
+            ) t
             JOIN categories c ON t.category_id = c.id
-            WHERE t.owner_id=%s AND c.name='Income'
-        """, (user["id"],))
-        income = cur.fetchone()["income"]
+            GROUP BY t.month
+            ORDER BY t.month DESC
+            LIMIT %s
+        """, (user["id"], user["id"], months))
+        return [
+            {
+                "month": row["month"],
+                "total_income": float(row["income"]),
+                "total_expense": float(row["expense"]),
+                "net_savings": float(row["income"] - row["expense"]),
+            }
+            for row in cur.fetchall()
+        ]
+
+
+# ------------------------
+# Archived months
+# ------------------------
+@router.get("/archive")
+def list_archived_months(username: str = Depends(get_current_user)):
+    with get_cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+        user = cur.fetchone()
+        if not user:
+            raise AppException("User not found", 404)
 
         cur.execute("""
-            SELECT COALESCE(SUM(amount),0) as expense
-            FROM transactions t
-            JOIN categories c ON t.category_id = c.id
-            WHERE t.owner_id=%s AND c.name='Expense'
+            SELECT month, row_count, archived_at FROM archive_months
+            WHERE owner_id = %s ORDER BY month DESC
         """, (user["id"],))
-        expense = cur.fetchone()["expense"]
+        return cur.fetchall()
+
+
+@router.post("/archive/restore")
+def restore_archived(
+    start: date = Query(..., description="First month to restore (YYYY-MM-DD)"),
+    end: date = Query(..., description="Last month to restore (YYYY-MM-DD)"),
+    username: str = Depends(get_current_user),
+):
+    with get_cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+        user = cur.fetchone()
+        if not user:
+            raise AppException("User not found", 404)
 
-        return {
-            "total_income": float(income or 0),
-            "total_expense": float(expense or 0),
-            "net_savings": float((income or 0) - (expense or 0))
-        }
+        restored = archive.restore_months(cur, user["id"], start, end)
+        if restored:
+            notify_change(cur, user["id"], "transaction", "imported", {"id": None, "inserted": restored},
+                          fetch_summary(cur, user["id"]))
+        logger.info(f"🗄️ {restored} archived transactions restored for {username}")
+        return {"restored": restored}
 
 
 # ------------------------
@@ -95,6 +294,7 @@ def get_summary(username: str = Depends(get_current_user)):
 def update_transaction(
     txn_id: int = Path(..., description="Transaction ID"),
     txn: schemas.TransactionCreate = None,
+    allow_duplicate: bool = Query(False, description="Save even if it matches an existing transaction"),
     username: str = Depends(get_current_user)
 ):
     with get_cursor() as cur:
@@ -115,17 +315,43 @@ def update_transaction(
         if not category:
             raise AppException("Invalid category for this user", 400)
 
-        cur.execute(
-            """
-            UPDATE transactions
-            SET amount=%s, category_id=%s, description=%s
-            WHERE id=%s AND owner_id=%s
-            RETURNING id, date, amount, category_id, description, owner_id
-            """,
-            (txn.amount, txn.category_id, txn.description, txn_id, user["id"])
-        )
+        if not allow_duplicate:
+            cur.execute(
+                """
+                WITH f AS (SELECT transaction_fingerprint(%(owner_id)s, %(date)s, %(amount)s, %(description)s) AS fp)
+                SELECT t.id FROM transactions t, f
+                WHERE t.owner_id = %(owner_id)s AND t.fingerprint = f.fp AND t.id <> %(id)s
+                UNION ALL
+                SELECT a.transaction_id FROM archive_fingerprints a, f
+                WHERE a.owner_id = %(owner_id)s AND a.fingerprint = f.fp
+                LIMIT 1
+                """,
+                {"owner_id": user["id"], "date": existing["date"], "amount": txn.amount,
+                 "description": txn.description, "id": txn_id},
+            )
+            duplicate = cur.fetchone()
+            if duplicate:
+                raise AppException(f"Duplicate of transaction {duplicate['id']}", 409)
+
+        try:
+            cur.execute(
+                """
+                UPDATE transactions
+                SET amount=%(amount)s, category_id=%(category_id)s, description=%(description)s,
+                    fingerprint = CASE WHEN %(allow_duplicate)s THEN NULL
+                                       ELSE transaction_fingerprint(owner_id, date, %(amount)s, %(description)s) END
+                WHERE id=%(id)s AND owner_id=%(owner_id)s
+                RETURNING id, date, amount, category_id, description, owner_id
+                """,
+                {"amount": txn.amount, "category_id": txn.category_id, "description": txn.description,
+                 "allow_duplicate": allow_duplicate, "id": txn_id, "owner_id": user["id"]},
+            )
+        except psycopg2.errors.UniqueViolation:
+            # a matching row was written concurrently
+            raise AppException("Duplicate of an existing transaction", 409)
         updated = cur.fetchone()
         updated["category_name"] = category["name"]
+        notify_change(cur, user["id"], "transaction", "updated", updated, fetch_summary(cur, user["id"]))
 
         logger.info(f"✏️ Transaction {txn_id} updated by {username}")
         return updated
@@ -151,6 +377,7 @@ def delete_transaction(
             raise AppException("Transaction not found", 404)
 
         cur.execute("DELETE FROM transactions WHERE id = %s AND owner_id = %s", (txn_id, user["id"]))
+        notify_change(cur, user["id"], "transaction", "deleted", {"id": txn_id}, fetch_summary(cur, user["id"]))
         logger.info(f"🗑️ Transaction {txn_id} deleted by {username}")
         return {"message": f"Transaction {txn_id} deleted successfully"}
 
@@ -159,27 +386,41 @@ def delete_transaction(
 # Export CSV
 # ------------------------
 @router.get("/export")
-def export_transactions(username: str = Depends(get_current_user)):
+def export_transactions(
+    username: str = Depends(get_current_user),
+    mode: Literal["stream", "job"] = Query("stream", description="stream: CSV now; job: background export file"),
+    format: Literal["csv", "jsonl"] = Query("csv", description="File format for job mode"),
+    start: date | None = Query(None, description="Start date (YYYY-MM-DD)"),
+    end: date | None = Query(None, description="End date (YYYY-MM-DD)"),
+    category_id: int | None = Query(None, description="Filter by category ID"),
+):
+    # validated above (bad dates are a 422); kept as ISO strings so job ids stay JSON-hashable
+    filters = {"start": start.isoformat() if start else None, "end": end.isoformat() if end else None,
+               "category_id": category_id}
     with get_cursor() as cur:
-        cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+        cur.execute("SELECT id, data_version FROM users WHERE username = %s", (username,))
         user = cur.fetchone()
         if not user:
             raise AppException("User not found", 404)
 
-        cur.execute("""
-            SELECT t.id, t.date, t.amount, c.name as category_name, t.description
-            FROM transactions t
-            LEFT JOIN categories c ON t.category_id = c.id
-            WHERE t.owner_id = %s ORDER BY t.date DESC
-        """, (user["id"],))
+        if mode == "job":
+            job_id = exports.job_id_for(user["id"], user["data_version"], format, filters)
+            status = exports.submit_export(user["id"], job_id, format, filters)
+            status["status_url"] = f"{router.prefix}/export/jobs/{job_id}"
+            logger.info(f"📦 Export job {job_id} ({status['status']}) for {username}")
+            return JSONResponse(status_code=202, content=status)
+
+        query, params = exports.build_export_query(user["id"], **filters)
+        cur.execute(query, params)
         rows = cur.fetchall()
+        rows.extend(archive.iter_archived_rows(cur, user["id"], **filters))
         if not rows:
             raise AppException("No transactions found", 404)
 
         # CSV output
         output = io.StringIO()
         writer = csv.writer(output)
-        writer.writerow(["ID", "Date", "Amount", "Category", "Description"])
+        writer.writerow(exports.CSV_HEADER)
         for row in rows:
             writer.writerow([row["id"], row["date"], row["amount"], row["category_name"], row["description"]])
 
@@ -193,6 +434,75 @@ def export_transactions(username: str = Depends(get_current_user)):
         )
 
 
+# ------------------------
+# Export job status
+# ------------------------
+@router.get("/export/jobs/{job_id}")
+def export_job_status(job_id: str = Path(..., pattern="^[0-9a-f]{32}$"), username: str = Depends(get_current_user)):
+    with get_cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+        user = cur.fetchone()
+        if not user:
+            raise AppException("User not found", 404)
+
+    status = exports.job_status(user["id"], job_id)
+    if not status:
+        raise AppException("Export job not found or expired", 404)
+    if status["status"] == "done":
+        status["download_url"] = f"{router.prefix}/export/jobs/{job_id}/download"
+    return status
+
+
+# ------------------------
+# Export job download (supports Range for resumable transfers)
+# ------------------------
+@router.get("/export/jobs/{job_id}/download")
+def download_export(
+    request: Request,
+    job_id: str = Path(..., pattern="^[0-9a-f]{32}$"),
+    username: str = Depends(get_current_user),
+):
+    with get_cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+        user = cur.fetchone()
+        if not user:
+            raise AppException("User not found", 404)
+
+    path = exports.result_path(user["id"], job_id)
+    if not path:
+        raise AppException("Export not ready or expired", 404)
+
+    stat = os.stat(path)
+    size = stat.st_size
+    fmt = path.rsplit(".", 2)[-2]
+    # a rebuilt file (same job_id after expiry) gets a new ETag, so stale If-Range falls back to 200
+    etag = f'"{job_id}-{size:x}-{stat.st_mtime_ns:x}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Disposition": f'attachment; filename="{username}_transactions.{fmt}.gz"',
+    }
+
+    # If-Range: only honour the range when the client still has this exact file
+    byte_range = None
+    if request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = exports.parse_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(exports.iter_file(path, 0, size - 1), media_type="application/gzip", headers=headers)
+
+    first, last = byte_range
+    headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    headers["Content-Length"] = str(last - first + 1)
+    return StreamingResponse(
+        exports.iter_file(path, first, last), status_code=206, media_type="application/gzip", headers=headers
+    )
+
+
 # ------------------------
 # Get transactions with filters & pagination
 # ------------------------
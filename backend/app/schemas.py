@@ -28,11 +28,21 @@ class TransactionCreate(BaseModel):
     description: Optional[str] = None
 
 
+class TransactionImport(TransactionCreate):
+    date: Optional[datetime] = None  # statement date; defaults to now
+
+
+class ImportResult(BaseModel):
+    received: int
+    inserted: int
+    duplicates: int
+
+
 class TransactionOut(BaseModel):
     id: int
     date: datetime
     amount: float
-    category_id: int
+    category_id: Optional[int] = None  # NULL once the category is deleted (ON DELETE SET NULL)
     category_name: Optional[str] = None  # join with categories.name
     description: Optional[str] = None
     owner_id: int
@@ -41,6 +51,12 @@ class TransactionOut(BaseModel):
         orm_mode = True
 
 
+class DuplicateGroup(BaseModel):
+    fingerprint: str
+    count: int
+    transactions: list[TransactionOut]
+
+
 class CategoryCreate(BaseModel):
     name: str
 
@@ -51,4 +67,15 @@ class CategoryOut(BaseModel):
     user_id: int
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class SummaryOut(BaseModel):
+    total_income: float
+    total_expense: float
+    net_savings: float
+
+
+class DashboardOut(BaseModel):
+    transactions: list[TransactionOut]
+    summary: SummaryOut
+    categories: list[CategoryOut]
@@ -0,0 +1,16 @@
+import pytest
+from app.core.admin_stats import in_refresh_window
+
+
+@pytest.mark.parametrize("hour, window, expected", [
+    (0, "0-6", True),
+    (5, "0-6", True),
+    (6, "0-6", False),
+    (14, "0-6", False),
+    (23, "22-4", True),
+    (3, "22-4", True),
+    (12, "22-4", False),
+    (12, "", True),
+])
+def test_in_refresh_window(hour, window, expected):
+    assert in_refresh_window(hour, window) is expected
@@ -0,0 +1,71 @@
+import pytest
+from app.core import admission
+from app.core.admission import RateLimiter, Rejected, classify, parse_limits
+
+
+def test_parse_limits():
+    assert parse_limits("auth=4/16, read=24/256,write=8") == {"auth": (4, 16), "read": (24, 256), "write": (8, 0)}
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("OPTIONS", "/transactions/", None),
+    ("GET", "/events/stream", None),
+    ("POST", "/auth/login", "auth"),
+    ("GET", "/transactions/export", "export"),
+    ("GET", "/transactions/export/jobs/abc", "read"),
+    ("GET", "/transactions/export/jobs/abc/download", "export"),
+    ("GET", "/dashboard/", "read"),
+    ("HEAD", "/transactions/", "read"),
+    ("POST", "/transactions/", "write"),
+    ("DELETE", "/transactions/1", "write"),
+])
+def test_classify(method, path, expected):
+    assert classify(method, path) == expected
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(admission.time, "monotonic", fake)
+    return fake
+
+
+def test_rate_limiter_burst_then_refill(clock):
+    limiter = RateLimiter(rate=2, burst=3)
+    for _ in range(3):
+        limiter.consume("alice", 1)
+    with pytest.raises(Rejected) as exc:
+        limiter.consume("alice", 1)
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after == 1
+
+    clock.now += 0.5
+    limiter.consume("alice", 1)
+    # other users have their own bucket
+    limiter.consume("bob", 3)
+
+
+def test_rate_limiter_never_exceeds_burst(clock):
+    limiter = RateLimiter(rate=10, burst=2)
+    limiter.consume("alice", 1)
+    clock.now += 60
+    limiter.consume("alice", 2)
+    with pytest.raises(Rejected):
+        limiter.consume("alice", 1)
+
+
+def test_rate_limiter_evicts_oldest_bucket(clock, monkeypatch):
+    monkeypatch.setattr(admission, "MAX_BUCKETS", 2)
+    limiter = RateLimiter(rate=1, burst=1)
+    limiter.consume("a", 1)
+    limiter.consume("b", 1)
+    limiter.consume("c", 1)
+    assert list(limiter.buckets) == ["b", "c"]
@@ -0,0 +1,119 @@
+import gzip
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from app.core import archive
+from app.core.archive import ARCHIVED_COLUMNS, _pack, _unpack
+
+
+def make_row(n):
+    return {
+        "id": n,
+        "date": datetime(2023, 1, n, 12, 30),
+        "amount": Decimal("-12.50") * n,
+        "category_id": None if n % 2 else 4,
+        "description": f"coffee #{n}",
+        "fingerprint": uuid.UUID(int=n),
+        "owner_id": 99,
+    }
+
+
+def test_pack_roundtrip_keeps_exact_values():
+    rows = [make_row(n) for n in range(1, 4)]
+    unpacked = _unpack(_pack(rows))
+    assert [r["date"] for r in unpacked] == [r["date"] for r in rows]
+    assert [r["amount"] for r in unpacked] == [Decimal("-12.50"), Decimal("-25.00"), Decimal("-37.50")]
+    assert [r["category_id"] for r in unpacked] == [None, 4, None]
+    assert [r["fingerprint"] for r in unpacked] == [str(r["fingerprint"]) for r in rows]
+
+
+def test_pack_stores_only_archived_columns():
+    lines = gzip.decompress(_pack([make_row(1)])).decode().splitlines()
+    assert list(json.loads(lines[0])) == list(ARCHIVED_COLUMNS)
+
+
+def test_unpack_accepts_memoryview():
+    blob = memoryview(_pack([make_row(2)]))
+    assert _unpack(blob)[0]["id"] == 2
+
+
+class FakeCursor:
+    def __init__(self, results):
+        self.results = list(results)
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append((" ".join(query.split()), params))
+
+    def fetchone(self):
+        return self.results.pop(0)
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cur):
+        self.cur = cur
+
+    def cursor(self, cursor_factory=None):
+        return self.cur
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_restore_keeps_months_hot(monkeypatch):
+    monkeypatch.setattr(archive.psycopg2.extras, "execute_values", lambda *args, **kwargs: None)
+    monkeypatch.setattr(archive.settings, "ARCHIVE_RESTORE_DAYS", 30)
+    month = date(2022, 1, 1)
+    cur = FakeCursor([[{"month": month, "rows": _pack([make_row(1)])}]])
+    assert archive.restore_months(cur, 99, month, month) == 1
+    (params,) = [p for q, p in cur.queries if q.startswith("INSERT INTO archive_restores")]
+    assert params == (99, 30, [month])
+
+
+def test_archive_run_skips_restored_months(monkeypatch):
+    cur = FakeCursor([{"cutoff": datetime(2024, 1, 1)}, [{"id": 99}], [], []])
+    monkeypatch.setattr(archive, "get_connection", lambda: FakeConnection(cur))
+    assert archive.archive_older_than(365) == 0
+    months_query = next(q for q, _ in cur.queries if "date_trunc('month', date)" in q)
+    assert "NOT EXISTS ( SELECT 1 FROM archive_restores r" in months_query
+    assert "r.restored_until > CURRENT_DATE" in months_query
+
+
+def capture_values(monkeypatch):
+    calls = []
+    monkeypatch.setattr(archive.psycopg2.extras, "execute_values",
+                        lambda cur, sql, args, **kwargs: calls.append((" ".join(sql.split()), args)))
+    return calls
+
+
+def test_archive_month_indexes_fingerprints(monkeypatch):
+    calls = capture_values(monkeypatch)
+    month = date(2023, 1, 1)
+    moved = [make_row(1), {**make_row(2), "fingerprint": None}]
+    cur = FakeCursor([moved, None])
+    assert archive.archive_month(cur, 99, month) == 2
+    assert ("DELETE FROM archive_fingerprints WHERE owner_id = %s AND month = %s", (99, month)) in cur.queries
+    (args,) = [a for sql, a in calls if sql.startswith("INSERT INTO archive_fingerprints")]
+    # rows saved with allow_duplicate have no fingerprint and are not indexed
+    assert args == [(99, uuid.UUID(int=1), 1, month)]
+
+
+def test_restore_clears_fingerprints(monkeypatch):
+    capture_values(monkeypatch)
+    month = date(2022, 1, 1)
+    cur = FakeCursor([[{"month": month, "rows": _pack([make_row(1)])}]])
+    archive.restore_months(cur, 99, month, month)
+    assert ("DELETE FROM archive_fingerprints WHERE owner_id = %s AND month = ANY(%s)", (99, [month])) in cur.queries
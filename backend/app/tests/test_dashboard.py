@@ -0,0 +1,45 @@
+from decimal import Decimal
+from app import schemas
+from app.routes.dashboard import DASHBOARD_QUERY, shape_dashboard
+
+
+def row(**overrides):
+    base = {"user_id": 1, "transactions": [], "income": None, "expense": None, "categories": []}
+    return {**base, **overrides}
+
+
+def test_empty_user():
+    out = schemas.DashboardOut(**shape_dashboard(row()))
+    assert out.transactions == []
+    assert out.categories == []
+    assert out.summary == schemas.SummaryOut(total_income=0, total_expense=0, net_savings=0)
+
+
+def test_null_side_of_summary():
+    summary = shape_dashboard(row(income=Decimal("120.50"), expense=None))["summary"]
+    assert summary == {"total_income": 120.5, "total_expense": 0.0, "net_savings": 120.5}
+
+
+def test_transaction_without_category():
+    # json_agg output: dates as ISO strings, deleted category -> NULL id and name
+    transactions = [
+        {"id": 2, "date": "2024-05-02T09:00:00", "amount": 5.0, "category_id": None,
+         "category_name": None, "description": None, "owner_id": 1},
+        {"id": 1, "date": "2024-05-01T09:00:00", "amount": 7.5, "category_id": 3,
+         "category_name": "Expense", "description": "lunch", "owner_id": 1},
+    ]
+    out = schemas.DashboardOut(**shape_dashboard(row(
+        transactions=transactions,
+        income=Decimal("0"), expense=Decimal("7.50"),
+        categories=[{"id": 3, "name": "Expense", "user_id": 1}],
+    )))
+    assert [t.id for t in out.transactions] == [2, 1]
+    assert out.transactions[0].category_id is None
+    assert out.summary.net_savings == -7.5
+
+
+def test_query_orders_page_inside_aggregate():
+    # json_agg over an ordered subquery does not guarantee order: it must be in the aggregate
+    assert "json_agg(page ORDER BY page.date DESC)" in DASHBOARD_QUERY
+    assert "LEFT JOIN categories c ON t.category_id = c.id" in DASHBOARD_QUERY
+    assert "archive_month_totals" in DASHBOARD_QUERY
@@ -0,0 +1,89 @@
+import pytest
+from app.core.config import settings
+from app.routes.events import ChangeBroker
+
+
+def change(user_id, n=0, size=10):
+    return {"user_id": user_id, "entity": "transaction", "op": "created", "row": {"id": n, "pad": "x" * size}}
+
+
+@pytest.fixture
+def broker():
+    return ChangeBroker()
+
+
+def test_replay_without_token_is_empty(broker):
+    broker.subscribe(1)
+    broker.publish(change(1))
+    assert broker.replay(1, None) == []
+
+
+def test_replay_returns_missed_events(broker):
+    queue = broker.subscribe(1)
+    for n in range(3):
+        broker.publish(change(1, n))
+    assert queue.qsize() == 3
+    first = queue.get_nowait()
+    missed = broker.replay(1, first["id"])
+    assert [e["data"]["row"]["id"] for e in missed] == [1, 2]
+
+
+def test_replay_from_other_epoch_resyncs(broker):
+    broker.subscribe(1)
+    broker.publish(change(1))
+    assert [e["event"] for e in broker.replay(1, "deadbeef-1")] == ["resync"]
+    assert [e["event"] for e in broker.replay(1, "garbage")] == ["resync"]
+
+
+def test_no_history_without_subscriber(broker):
+    broker.publish(change(1))
+    assert 1 not in broker.history
+    # the event is unknown, so a token from before it must resync
+    assert [e["event"] for e in broker.replay(1, f"{broker.epoch}-0")] == ["resync"]
+    assert broker.replay(1, f"{broker.epoch}-{broker.seq}") == []
+
+
+def test_history_trimmed_by_count(broker, monkeypatch):
+    monkeypatch.setattr(settings, "SSE_HISTORY_SIZE", 2)
+    broker.subscribe(1)
+    for n in range(4):
+        broker.publish(change(1, n))
+    assert [e["seq"] for e in broker.history[1].events] == [3, 4]
+    assert [e["event"] for e in broker.replay(1, f"{broker.epoch}-1")] == ["resync"]
+    assert [e["seq"] for e in broker.replay(1, f"{broker.epoch}-2")] == [3, 4]
+
+
+def test_history_trimmed_by_bytes(broker, monkeypatch):
+    monkeypatch.setattr(settings, "SSE_HISTORY_BYTES", 500)
+    broker.subscribe(1)
+    for n in range(5):
+        broker.publish(change(1, n, size=200))
+    entry = broker.history[1]
+    assert entry.bytes <= 500
+    assert entry.bytes == sum(len(e["frame"]) for e in entry.events)
+    assert broker.history_bytes == entry.bytes
+
+
+def test_total_budget_evicts_least_recent_user(broker, monkeypatch):
+    monkeypatch.setattr(settings, "SSE_HISTORY_TOTAL_BYTES", 700)
+    broker.subscribe(1)
+    broker.subscribe(2)
+    broker.publish(change(1, size=200))
+    broker.publish(change(2, size=200))
+    broker.publish(change(2, size=200))
+    assert list(broker.history) == [2]
+    assert broker.history_bytes == broker.history[2].bytes
+
+
+def test_history_kept_within_resume_window(broker, monkeypatch):
+    queue = broker.subscribe(1)
+    broker.publish(change(1))
+    token = queue.get_nowait()["id"]
+    broker.unsubscribe(1, queue)
+    broker.publish(change(1, 1))
+    assert [e["data"]["row"]["id"] for e in broker.replay(1, token)] == [1]
+
+    monkeypatch.setattr(settings, "SSE_RESUME_WINDOW_SECONDS", -1)
+    broker.publish(change(1, 2))
+    assert 1 not in broker.history
+    assert [e["event"] for e in broker.replay(1, token)] == ["resync"]
@@ -0,0 +1,109 @@
+import os
+import time
+import pytest
+from app.core import exports
+from app.core.config import settings
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(exports, "_last_cleanup", 0.0)
+    return tmp_path
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=90-500", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=10-5", None),
+    ("bytes=a-b", None),
+    ("bytes=-", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-9", None),
+])
+def test_parse_range(header, expected):
+    assert exports.parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header, size", [("bytes=-0", 100), ("bytes=100-", 100), ("bytes=-5", 0)])
+def test_parse_range_unsatisfiable(header, size):
+    with pytest.raises(ValueError):
+        exports.parse_range(header, size)
+
+
+def test_job_id_for_is_stable_and_filter_sensitive():
+    filters = {"start": "2024-01-01", "end": None, "category_id": None}
+    job = exports.job_id_for(1, 7, "csv", filters)
+    assert job == exports.job_id_for(1, 7, "csv", dict(reversed(filters.items())))
+    assert len(job) == 32
+    assert job != exports.job_id_for(1, 8, "csv", filters)
+    assert job != exports.job_id_for(1, 7, "jsonl", filters)
+    assert job != exports.job_id_for(2, 7, "csv", filters)
+    assert job != exports.job_id_for(1, 7, "csv", {**filters, "category_id": 3})
+
+
+def test_run_lock_is_exclusive(spool):
+    base = os.path.join(exports._user_dir(1), "a" * 32)
+    fd = exports._try_lock(base)
+    assert fd is not None
+    try:
+        assert exports._try_lock(base) is None
+        assert exports.job_status(1, "a" * 32) == {"job_id": "a" * 32, "status": "running"}
+    finally:
+        os.close(fd)
+    assert exports.job_status(1, "a" * 32) is None
+
+
+def test_lock_ownership_lost_when_file_replaced(spool):
+    base = os.path.join(exports._user_dir(1), "b" * 32)
+    fd = exports._try_lock(base)
+    try:
+        assert exports._owns_lock(fd, base)
+        os.remove(f"{base}.lock")
+        open(f"{base}.lock", "w").close()
+        assert not exports._owns_lock(fd, base)
+    finally:
+        os.close(fd)
+
+
+def test_cleanup_spares_running_job(spool, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_STALE_SECONDS", 0)
+    base = os.path.join(exports._user_dir(1), "c" * 32)
+    fd = exports._try_lock(base)
+    part = f"{base}.part.live"
+    open(part, "w").close()
+    old = time.time() - 10
+    os.utime(part, (old, old))
+    try:
+        exports._cleanup_expired()
+        assert os.path.exists(part)
+    finally:
+        os.close(fd)
+
+    monkeypatch.setattr(exports, "_last_cleanup", 0.0)
+    exports._cleanup_expired()
+    assert not os.path.exists(part)
+    assert not os.path.exists(f"{base}.lock")
+
+
+def test_iter_file_range(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(bytes(range(100)))
+    assert b"".join(exports.iter_file(str(path), 10, 19, chunk_size=3)) == bytes(range(10, 20))
+
+
+@pytest.mark.parametrize("query", ["start=2024-13-40", "end=yesterday", "mode=job&start=01/02/2024"])
+def test_export_rejects_bad_dates(query):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.routes import transactions
+
+    app = FastAPI()
+    app.include_router(transactions.router)
+    app.dependency_overrides[transactions.get_current_user] = lambda: "alice"
+    # validation fails before any database access
+    assert TestClient(app).get(f"/transactions/export?{query}").status_code == 422
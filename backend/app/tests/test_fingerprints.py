@@ -0,0 +1,171 @@
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from app import schemas
+from app.core.exceptions import AppException
+from app.core.fingerprints import FINGERPRINT_FUNCTION, fingerprint, normalise_description
+from app.routes import transactions
+from scripts.backfill_fingerprints import BACKFILL_BATCH
+
+MORNING = datetime(2024, 3, 5, 8, 15)
+
+
+# ------------------------
+# Matching rules
+# ------------------------
+@pytest.mark.parametrize("raw, expected", [
+    ("  Coffee @ Starbucks!! ", "coffee starbucks"),
+    ("COFFEE-starbucks", "coffee starbucks"),
+    ("Rent  #42", "rent 42"),
+    ("", ""),
+    (None, ""),
+    ("***", ""),
+])
+def test_normalise_description(raw, expected):
+    assert normalise_description(raw) == expected
+
+
+def test_same_day_amount_and_text_match():
+    evening = datetime(2024, 3, 5, 22, 40)
+    assert fingerprint(1, MORNING, Decimal("12.5"), "Coffee!") == fingerprint(1, evening, 12.50, "  coffee ")
+
+
+@pytest.mark.parametrize("other", [
+    (2, MORNING, Decimal("12.50"), "coffee"),
+    (1, datetime(2024, 3, 6, 8, 15), Decimal("12.50"), "coffee"),
+    (1, MORNING, Decimal("12.51"), "coffee"),
+    (1, MORNING, Decimal("-12.50"), "coffee"),
+    (1, MORNING, Decimal("12.50"), "coffee beans"),
+])
+def test_any_difference_is_a_new_transaction(other):
+    assert fingerprint(1, MORNING, Decimal("12.50"), "coffee") != fingerprint(*other)
+
+
+def test_amount_rounds_to_cents_like_numeric_12_2():
+    assert fingerprint(1, MORNING, Decimal("12.505"), "x") == fingerprint(1, MORNING, Decimal("12.51"), "x")
+    assert fingerprint(1, MORNING, Decimal("-12.505"), "x") == fingerprint(1, MORNING, Decimal("-12.51"), "x")
+
+
+def test_sql_function_uses_the_same_rules():
+    # DateStyle-independent day bucket; IMMUTABLE so it can back a stored column
+    assert "to_char(d, 'YYYY-MM-DD')" in FINGERPRINT_FUNCTION
+    assert "'[^a-z0-9]+', ' ', 'g'" in FINGERPRINT_FUNCTION
+    assert "amount::numeric(12,2)" in FINGERPRINT_FUNCTION
+    assert "IMMUTABLE" in FINGERPRINT_FUNCTION
+
+
+def test_backfill_fingerprints_oldest_row_of_a_group():
+    assert "DISTINCT ON (fp) id, fp" in BACKFILL_BATCH
+    assert "ORDER BY fp, id" in BACKFILL_BATCH
+    assert "NOT EXISTS (SELECT 1 FROM transactions o WHERE o.fingerprint = s.fp)" in BACKFILL_BATCH
+    assert "a.owner_id = t.owner_id AND a.fingerprint = s.fp" in BACKFILL_BATCH
+
+
+# ------------------------
+# Write paths
+# ------------------------
+class FakeCursor:
+    def __init__(self, results):
+        self.results = list(results)
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append((" ".join(query.split()), params))
+
+    def fetchone(self):
+        return self.results.pop(0)
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+    def ran(self, fragment):
+        return [params for query, params in self.queries if fragment in query]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    state = {}
+
+    def use(results):
+        state["cur"] = FakeCursor(results)
+        return state["cur"]
+
+    @contextmanager
+    def get_cursor():
+        yield state["cur"]
+
+    monkeypatch.setattr(transactions, "get_cursor", get_cursor)
+    monkeypatch.setattr(transactions, "fetch_summary", lambda cur, user_id: None)
+    monkeypatch.setattr(transactions, "notify_change", lambda *args, **kwargs: None)
+    return use
+
+
+USER = {"id": 7}
+CATEGORY = {"id": 3, "name": "Expense"}
+NEW_ROW = {"id": 11, "date": MORNING, "amount": Decimal("4.20"), "category_id": 3, "description": "tea", "owner_id": 7}
+
+
+def create(allow_duplicate=False):
+    txn = schemas.TransactionCreate(amount=4.2, category_id=3, description="tea")
+    return transactions.create_transaction(txn, allow_duplicate=allow_duplicate, username="alice")
+
+
+def test_create_rejects_known_duplicate(db):
+    cur = db([USER, CATEGORY, {"id": 5}])
+    with pytest.raises(AppException) as exc:
+        create()
+    assert exc.value.status_code == 409
+    assert "5" in exc.value.message
+    assert not cur.ran("INSERT INTO transactions")
+    # probe is scoped to the owner and also sees archived rows
+    probe = next(q for q, _ in cur.queries if "transaction_fingerprint(" in q)
+    assert "t.owner_id = %(owner_id)s AND t.fingerprint = f.fp" in probe
+    assert "FROM archive_fingerprints a, f WHERE a.owner_id = %(owner_id)s AND a.fingerprint = f.fp" in probe
+
+
+def test_create_inserts_when_no_duplicate(db):
+    cur = db([USER, CATEGORY, None, dict(NEW_ROW)])
+    assert create()["category_name"] == "Expense"
+    insert = next(q for q, _ in cur.queries if q.startswith("INSERT INTO transactions"))
+    assert "ON CONFLICT DO NOTHING" in insert
+
+
+def test_create_race_lost_to_concurrent_insert_is_409(db):
+    db([USER, CATEGORY, None, None, {"id": 12}])
+    with pytest.raises(AppException) as exc:
+        create()
+    assert exc.value.status_code == 409
+
+
+def test_allow_duplicate_skips_probe_and_stores_no_fingerprint(db):
+    cur = db([USER, CATEGORY, dict(NEW_ROW)])
+    create(allow_duplicate=True)
+    assert len(cur.ran("WITH f AS")) == 0
+    (params,) = cur.ran("INSERT INTO transactions")
+    assert params["allow_duplicate"] is True
+
+
+def test_import_dedupes_in_batch_and_against_stored(db, monkeypatch):
+    calls = {}
+
+    def execute_values(cur, sql, argslist, template=None, fetch=False):
+        calls.update(sql=" ".join(sql.split()), args=argslist)
+        return [(1,), (2,)]
+
+    monkeypatch.setattr(transactions.psycopg2.extras, "execute_values", execute_values)
+    db([USER, [{"id": 3}]])
+    rows = [schemas.TransactionImport(amount=1, category_id=3, description="a", date=MORNING),
+            schemas.TransactionImport(amount=1, category_id=3, description="A!", date=MORNING),
+            schemas.TransactionImport(amount=2, category_id=3, description="b")]
+    result = transactions.import_transactions(rows, username="alice")
+
+    assert result == {"received": 3, "inserted": 2, "duplicates": 1}
+    sql = calls["sql"]
+    assert "SELECT DISTINCT ON (f.fp)" in sql
+    assert "o.owner_id = f.owner_id AND o.fingerprint = f.fp" in sql
+    assert "a.owner_id = f.owner_id AND a.fingerprint = f.fp" in sql
+    assert "ON CONFLICT DO NOTHING" in sql
+    # undated rows are stamped by the database, not the app server clock
+    assert "COALESCE(r.date, LOCALTIMESTAMP)" in sql
+    assert calls["args"][2][0] is None
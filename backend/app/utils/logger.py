@@ -1,4 +1,5 @@
 import logging
+import re
 from app.core.config import settings
 
 # Configure logging
@@ -19,3 +20,22 @@ ch.setFormatter(formatter)
 # Avoid duplicate handlers
 if not logger.handlers:
     logger.addHandler(ch)
+
+
+# Redact credentials passed in query strings (the SSE stream takes ?token=)
+TOKEN_PARAM = re.compile(r"([?&]token=)[^&\s]*")
+
+
+def redact(text: str) -> str:
+    return TOKEN_PARAM.sub(r"\1***", text)
+
+
+class RedactTokenFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple):
+            record.args = tuple(redact(a) if isinstance(a, str) else a for a in record.args)
+        return True
+
+
+# uvicorn's access log prints the full path including the query string
+logging.getLogger("uvicorn.access").addFilter(RedactTokenFilter())
@@ -0,0 +1,38 @@
+"""
+Move whole months older than ARCHIVE_AFTER_DAYS out of the hot transactions
+table into the compressed archive tier (archive_months + archive_month_totals).
+
+Each (owner, month) is moved in its own short transaction. Summaries, monthly
+totals and exports keep returning full history by merging the archive.
+Months archived before archive_fingerprints existed are indexed first, so
+duplicate checks see every archived row.
+
+The (owner_id, date) index it reads through is built CONCURRENTLY on the
+first run (and rebuilt if a previous build was left INVALID).
+
+Usage (run from backend/):
+    python -m scripts.archive_transactions --older-than-days 365
+"""
+import argparse
+from app.core.archive import archive_older_than, index_archived_fingerprints
+from app.core.config import settings
+from app.db_init import ensure_archive_index
+from app.utils.logger import logger
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--older-than-days", type=int, default=settings.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch", type=int, default=100, help="Owners per page")
+    args = parser.parse_args()
+
+    ensure_archive_index()
+    indexed = index_archived_fingerprints()
+    if indexed:
+        logger.info(f"🔎 Indexed fingerprints of {indexed} previously archived months")
+    archived = archive_older_than(args.older_than_days, args.batch)
+    logger.info(f"✅ Archive run done: {archived} transactions moved")
+
+
+if __name__ == "__main__":
+    main()
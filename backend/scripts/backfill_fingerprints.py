@@ -0,0 +1,85 @@
+"""
+Backfill transactions.fingerprint in small id-range batches.
+
+Safe to run on a live, large table: each batch is its own short transaction
+touching at most --batch rows, so there is never a table-wide lock. Within
+a fingerprint group only the oldest row gets the fingerprint; later copies
+stay NULL and show up in GET /transactions/duplicates. Rows matching an
+archived transaction (see archive_fingerprints) also stay NULL. Re-running
+resumes where rows are still NULL.
+
+The unique fingerprint index is built (or an INVALID leftover rebuilt)
+CONCURRENTLY first; this is the only place it is created, so run this once
+after deploying and again if a build was interrupted.
+
+Usage (run from backend/):
+    python -m scripts.backfill_fingerprints --batch 5000 --pause 0.05
+"""
+import argparse
+import time
+import psycopg2
+import psycopg2.errors
+from app.core.archive import index_archived_fingerprints
+from app.db import get_connection
+from app.db_init import ensure_fingerprint_index
+from app.utils.logger import logger
+
+BACKFILL_BATCH = """
+    UPDATE transactions t
+    SET fingerprint = s.fp
+    FROM (
+        SELECT DISTINCT ON (fp) id, fp
+        FROM (
+            SELECT id, transaction_fingerprint(owner_id, date, amount, description) AS fp
+            FROM transactions
+            WHERE id >= %s AND id < %s AND fingerprint IS NULL
+        ) candidates
+        ORDER BY fp, id
+    ) s
+    WHERE t.id = s.id
+      AND NOT EXISTS (SELECT 1 FROM transactions o WHERE o.fingerprint = s.fp)
+      AND NOT EXISTS (SELECT 1 FROM archive_fingerprints a WHERE a.owner_id = t.owner_id AND a.fingerprint = s.fp)
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between batches")
+    parser.add_argument("--start-id", type=int, default=None)
+    args = parser.parse_args()
+
+    ensure_fingerprint_index()
+    index_archived_fingerprints()
+
+    conn = get_connection()
+    cur = conn.cursor()
+    # ids past the current max are written by the app with a fingerprint already
+    cur.execute("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM transactions WHERE fingerprint IS NULL")
+    first_id, last_id = cur.fetchone()
+    conn.commit()
+
+    lower = args.start_id if args.start_id is not None else first_id
+    updated = 0
+    started = time.perf_counter()
+    while lower <= last_id:
+        upper = lower + args.batch
+        try:
+            cur.execute(BACKFILL_BATCH, (lower, upper))
+            updated += cur.rowcount
+            conn.commit()
+        except psycopg2.errors.UniqueViolation:
+            # a live write took one of these fingerprints mid-batch; retry the range
+            conn.rollback()
+            continue
+        logger.info(f"Fingerprinted ids [{lower}, {upper}) - {updated} rows so far")
+        lower = upper
+        time.sleep(args.pause)
+
+    cur.close()
+    conn.close()
+    logger.info(f"✅ Backfill done: {updated} rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
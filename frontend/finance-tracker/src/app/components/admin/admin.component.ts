@@ -1,6 +1,5 @@
 import { Component, OnInit } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
-import { environment } from '../../../environments/environment.development';
+import { AdminService } from '../../services/admin.service';
 import { AuthService } from '../../services/auth.service';
 
 @Component({
@@ -10,31 +9,61 @@ import { AuthService } from '../../services/auth.service';
 })
 export class AdminComponent implements OnInit {
   users: any[] = [];
+  nextCursor: number | null = null;
+  search = '';
+  stats: any = null;
 
-  constructor(private http: HttpClient, private authService: AuthService) {}
+  constructor(private adminService: AdminService, private authService: AuthService) {}
 
   ngOnInit(): void {
     this.loadUsers();
+    this.loadStats();
   }
 
+  // 🔹 First page (also used after search / role changes)
   loadUsers() {
-    this.http.get<any[]>(`${environment.apiBaseUrl}/admin/users`).subscribe({
-      next: (data) => this.users = data,
+    this.adminService.getUsers(null, this.search).subscribe({
+      next: (page) => {
+        this.users = page.items;
+        this.nextCursor = page.next_cursor;
+      },
       error: (err) => console.error('❌ Failed to load users', err)
     });
   }
 
+  loadMore() {
+    if (this.nextCursor === null) return;
+    this.adminService.getUsers(this.nextCursor, this.search).subscribe({
+      next: (page) => {
+        this.users = this.users.concat(page.items);
+        this.nextCursor = page.next_cursor;
+      },
+      error: (err) => console.error('❌ Failed to load users', err)
+    });
+  }
+
+  loadStats() {
+    this.adminService.getStats().subscribe({
+      next: (data) => this.stats = data,
+      error: (err) => console.error('❌ Failed to load stats', err)
+    });
+  }
+
   makeAdmin(userId: number) {
-    this.http.patch(`${environment.apiBaseUrl}/admin/make-admin/${userId}`, {}).subscribe({
-      next: () => this.loadUsers(),
+    this.adminService.makeAdmin(userId).subscribe({
+      next: (updated) => this.replaceUser(updated),
       error: (err) => console.error('❌ Failed to promote user', err)
     });
   }
 
   removeAdmin(userId: number) {
-    this.http.patch(`${environment.apiBaseUrl}/admin/remove-admin/${userId}`, {}).subscribe({
-      next: () => this.loadUsers(),
+    this.adminService.removeAdmin(userId).subscribe({
+      next: (updated) => this.replaceUser(updated),
       error: (err) => console.error('❌ Failed to demote user', err)
     });
   }
+
+  private replaceUser(updated: any) {
+    this.users = this.users.map(u => u.id === updated.id ? updated : u);
+  }
 }
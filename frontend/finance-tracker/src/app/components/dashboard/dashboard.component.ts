@@ -1,6 +1,7 @@
-import { Component, OnInit } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
-import { TransactionService, Transaction, Summary } from '../../services/transaction.service';
+import { Component, OnDestroy, OnInit } from '@angular/core';
+import { HttpClient, HttpErrorResponse } from '@angular/common/http';
+import { Subscription } from 'rxjs';
+import { TransactionService, Transaction, Summary, ChangeEvent } from '../../services/transaction.service';
 import { AuthService } from '../../services/auth.service';
 import { environment } from '../../../environments/environment.development';
 
@@ -9,7 +10,7 @@ import { environment } from '../../../environments/environment.development';
   templateUrl: './dashboard.component.html',
   styleUrls: ['./dashboard.component.scss']
 })
-export class DashboardComponent implements OnInit {
+export class DashboardComponent implements OnInit, OnDestroy {
   transactions: Transaction[] = [];
   summary: Summary | null = null;
   categories: any[] = [];
@@ -17,6 +18,7 @@ export class DashboardComponent implements OnInit {
   newTxn = { amount: 0, category_id: 0, description: '' };
   newCategory = '';
   isAdmin = false;
+  private changes?: Subscription;
 
   constructor(
     private txnService: TransactionService,
@@ -25,10 +27,52 @@ export class DashboardComponent implements OnInit {
   ) {}
 
   ngOnInit(): void {
-    this.loadTransactions();
-    this.loadSummary();
-    this.loadCategories();
+    this.loadDashboard();
     this.isAdmin = this.authService.isAdmin();
+
+    const token = this.authService.getToken();
+    if (token) {
+      this.changes = this.txnService.streamChanges(token).subscribe((change) => this.applyChange(change));
+    }
+  }
+
+  ngOnDestroy(): void {
+    this.changes?.unsubscribe();
+  }
+
+  // 📡 Apply a pushed change (from this or another device)
+  applyChange(change: ChangeEvent) {
+    if (change.type === 'resync' || change.partial || change.op === 'imported') {
+      this.loadDashboard();
+      return;
+    }
+    if (change.summary) {
+      this.summary = change.summary;
+    }
+    const row = change.row;
+    if (change.entity === 'transaction') {
+      this.transactions = this.transactions.filter(t => t.id !== row.id);
+      if (change.op !== 'deleted') {
+        this.transactions.unshift(row);
+        this.transactions.sort((a, b) => b.date.localeCompare(a.date));
+      }
+    } else if (change.entity === 'category') {
+      this.categories = this.categories.filter(c => c.id !== row.id);
+      if (change.op !== 'deleted') {
+        this.categories.push(row);
+      }
+    }
+  }
+
+  loadDashboard() {
+    this.txnService.getDashboard().subscribe({
+      next: (data) => {
+        this.transactions = data.transactions;
+        this.summary = data.summary;
+        this.categories = data.categories;
+      },
+      error: (err) => console.error('❌ Failed to load dashboard', err)
+    });
   }
 
   loadTransactions() {
@@ -57,7 +101,7 @@ export class DashboardComponent implements OnInit {
     if (!this.newCategory.trim()) return;
     this.http.post<any>(`${environment.apiBaseUrl}/categories`, { name: this.newCategory }).subscribe({
       next: (cat) => {
-        this.categories.push(cat);
+        this.categories = this.categories.filter(c => c.id !== cat.id).concat(cat);
         this.newCategory = '';
       },
       error: (err) => console.error('❌ Failed to add category', err)
@@ -71,14 +115,23 @@ export class DashboardComponent implements OnInit {
     });
   }
 
-  addTransaction() {
-    this.txnService.addTransaction(this.newTxn).subscribe({
+  addTransaction(allowDuplicate = false) {
+    this.txnService.addTransaction(this.newTxn, allowDuplicate).subscribe({
       next: (txn) => {
-        this.transactions.unshift(txn);
-        this.loadSummary();
+        this.transactions = [txn, ...this.transactions.filter(t => t.id !== txn.id)];
         this.newTxn = { amount: 0, category_id: 0, description: '' };
       },
-      error: (err) => console.error(err)
+      error: (err: HttpErrorResponse) => {
+        // same day, amount and description as an existing one: let the user decide
+        if (err.status === 409 && !allowDuplicate) {
+          const message = err.error?.error || 'This looks like a duplicate transaction';
+          if (confirm(`${message}. Save it anyway?`)) {
+            this.addTransaction(true);
+          }
+          return;
+        }
+        console.error(err);
+      }
     });
   }
 
@@ -86,7 +139,6 @@ export class DashboardComponent implements OnInit {
     this.txnService.deleteTransaction(id).subscribe({
       next: () => {
         this.transactions = this.transactions.filter(t => t.id !== id);
-        this.loadSummary();
       },
       error: (err) => console.error(err)
     });
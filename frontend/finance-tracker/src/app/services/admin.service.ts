@@ -1,16 +1,28 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpParams } from '@angular/common/http';
 import { Observable } from 'rxjs';
 import { environment } from '../../environments/environment.development';
 
+export interface UserPage {
+  items: any[];
+  next_cursor: number | null;
+}
+
 @Injectable({ providedIn: 'root' })
 export class AdminService {
   private base = environment.apiBaseUrl + '/admin';
 
   constructor(private http: HttpClient) {}
 
-  getUsers(): Observable<any[]> {
-    return this.http.get<any[]>(`${this.base}/users`);
+  getUsers(afterId: number | null = null, search = '', limit = 50): Observable<UserPage> {
+    let params = new HttpParams().set('limit', limit);
+    if (afterId !== null) params = params.set('after_id', afterId);
+    if (search) params = params.set('search', search);
+    return this.http.get<UserPage>(`${this.base}/users`, { params });
+  }
+
+  getStats(days = 30, top = 10): Observable<any> {
+    return this.http.get(`${this.base}/stats`, { params: { days, top } });
   }
 
   makeAdmin(userId: number): Observable<any> {
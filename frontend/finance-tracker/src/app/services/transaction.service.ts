@@ -1,5 +1,5 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpParams } from '@angular/common/http';
 import { Observable } from 'rxjs';
 import { environment } from '../../environments/environment.development';
 
@@ -20,6 +20,21 @@ export interface Summary {
   net_savings: number;
 }
 
+export interface ChangeEvent {
+  type: 'change' | 'resync';
+  entity?: 'transaction' | 'category';
+  op?: 'created' | 'updated' | 'deleted' | 'imported';
+  row?: any;
+  summary?: Summary | null;
+  partial?: boolean;
+}
+
+export interface Dashboard {
+  transactions: Transaction[];
+  summary: Summary;
+  categories: any[];
+}
+
 @Injectable({
   providedIn: 'root'
 })
@@ -28,13 +43,30 @@ export class TransactionService {
 
   constructor(private http: HttpClient) {}
 
+  // ✅ Live changes (SSE). EventSource resends Last-Event-ID on reconnect.
+  streamChanges(token: string): Observable<ChangeEvent> {
+    return new Observable<ChangeEvent>((observer) => {
+      const source = new EventSource(`${this.apiUrl}/events/stream?token=${encodeURIComponent(token)}`);
+      source.addEventListener('change', (e) => observer.next({ type: 'change', ...JSON.parse((e as MessageEvent).data) }));
+      source.addEventListener('resync', () => observer.next({ type: 'resync' }));
+      return () => source.close();
+    });
+  }
+
+  // ✅ Dashboard (transactions + summary + categories in one call)
+  getDashboard(): Observable<Dashboard> {
+    return this.http.get<Dashboard>(`${this.apiUrl}/dashboard/`);
+  }
+
   // ✅ Transactions
   getTransactions(): Observable<Transaction[]> {
     return this.http.get<Transaction[]>(`${this.apiUrl}/transactions/`);
   }
 
-  addTransaction(txn: Partial<Transaction>): Observable<Transaction> {
-    return this.http.post<Transaction>(`${this.apiUrl}/transactions/`, txn);
+  // allowDuplicate saves it even if it matches an existing transaction (the API answers 409 otherwise)
+  addTransaction(txn: Partial<Transaction>, allowDuplicate = false): Observable<Transaction> {
+    const params = allowDuplicate ? new HttpParams().set('allow_duplicate', true) : undefined;
+    return this.http.post<Transaction>(`${this.apiUrl}/transactions/`, txn, { params });
   }
 
   deleteTransaction(id: number): Observable<any> {